@@ -15,6 +15,12 @@
     "author": "Yevhen Babii",
     "website": "Website",
     "license": "Other proprietary",
+    "depends": ["base"],
+    "data": [
+        "security/ir.model.access.csv",
+        "data/ir_cron_data.xml",
+        "views/declension_ua_cache_views.xml",
+    ],
     "external_dependencies": {
         "python": ["pymorphy3",
                    "pymorphy3-dicts-uk",
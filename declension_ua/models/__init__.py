@@ -1 +1,3 @@
 from . import declension_ua
+from . import declension_ua_cache
+from . import declension_ua_queue
@@ -1,26 +1,225 @@
-from odoo import api, models
-import pymorphy3
+import logging
+import os
+import time
+
+from odoo import api, models, tools
+
+from . import engines, lexicon, phrase
+
+_logger = logging.getLogger(__name__)
+
+# Per-process counters of the phrase inflection cache:
+# - hits: served from the in-memory LRU (ormcache)
+# - lexicon_hits: served from the shipped military lexicon
+# - db_hits: served from the declension_ua_cache table
+# - misses: computed by the morphological analyzer
+_cache_stats = {
+    "lookups": 0,
+    "lexicon_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+}
+
+# Corrections made by hand, per process: ``{(phrase, case): value}`` loaded
+# again when their version in the cache table changes. They are served before
+# the ormcache, which therefore never needs to be cleared when they change.
+_manual_inflections = {
+    "version": None,
+    "inflections": {},
+}
+
+# Below this number of phrases to inflect a process pool costs more than it saves
+PARALLEL_MIN_PHRASES = 200
 
 
 class DeclensionUA(models.AbstractModel):
     _name = 'declension.ua'
     _description = 'Declension for Ukrainian names'
 
+    def _register_hook(self):
+        # Engines listed in the ``declension_preload`` option of the server
+        # configuration (pymorphy3 by default) are warmed while the registry
+        # loads so that the first request of a worker does not pay for them.
+        # Set it empty to load every engine lazily on first use.
+        start = time.perf_counter()
+        preload = tools.config.get('declension_preload', 'pymorphy3') or ''
+        for name in filter(None, (name.strip() for name in preload.split(','))):
+            if name in engines.ENGINES:
+                engines.get_engine(name)
+            else:
+                _logger.warning("Unknown declension engine %r in declension_preload", name)
+        _logger.info("declension_ua registry hook took %.3fs, loaded engines: %s",
+                     time.perf_counter() - start,
+                     ', '.join(name for name in engines.ENGINES if engines.is_loaded(name)) or 'none')
+        return super()._register_hook()
+
     @api.model
-    def _compute_inflected_field(self, value, grammatical_case):
-        morph = pymorphy3.MorphAnalyzer(lang='uk')
-        if isinstance(value, str):
-            words = value.split()
-            inflected_words = []
-            for word in words:
-                # Check if the word contains any numeric characters
-                if any(char.isdigit() for char in word):
-                    inflected_words.append(word)
+    def get_analyzer_stats(self):
+        return engines.get_stats('pymorphy3')
+
+    @api.model
+    def get_engine_stats(self):
+        return engines.get_stats()
+
+    @api.model
+    def get_cache_stats(self):
+        stats = dict(_cache_stats)
+        stats["hits"] = (stats["lookups"] - stats["lexicon_hits"]
+                         - stats["db_hits"] - stats["misses"])
+        return stats
+
+    @api.model
+    def _get_parallel_processes(self):
+        """ Number of processes for bulk declension, 0 when disabled.
+
+        Parallel declension is enabled by the ``declension_parallel`` context
+        key (True or a number of processes) or by the ``declension_workers``
+        option of the server configuration.
+        """
+        processes = self.env.context.get('declension_parallel')
+        if processes is True:
+            processes = os.cpu_count() or 1
+        if not processes:
+            processes = tools.config.get('declension_workers', 0)
+        try:
+            processes = int(processes)
+        except (TypeError, ValueError):
+            _logger.warning("Invalid number of declension processes: %r", processes)
+            return 0
+        return processes if processes > 1 else 0
+
+    @api.model
+    def _is_deferred(self):
+        """ Whether declension of stored fields is left to the queue cron.
+
+        Deferred mode is enabled by the ``declension_deferred`` context key or
+        option of the server configuration, the context key taking precedence.
+        The ``declension_sync`` context key always inflects synchronously.
+        """
+        if self.env.context.get('declension_sync'):
+            return False
+        if 'declension_deferred' in self.env.context:
+            return bool(self.env.context['declension_deferred'])
+        return tools.str2bool(str(tools.config.get('declension_deferred') or ''), False)
+
+    @api.model
+    def _lookup_stored_inflections(self, phrases, grammatical_cases):
+        """ Resolve ``phrases`` from the cache table and the lexicon only.
+
+        :return: ``(inflections, missing)`` where ``inflections`` is a dict
+                 ``{(phrase, grammatical_case): value}`` and ``missing`` the set
+                 of phrases lacking an inflection in some case
+        """
+        cache_model = self.env['declension.ua.cache'].sudo()
+        stored = cache_model._lookup_many(phrases, grammatical_cases)
+        _cache_stats["lookups"] += len(phrases) * len(grammatical_cases)
+        inflections = {}
+        missing = set()
+        for name in phrases:
+            for grammatical_case in grammatical_cases:
+                key = (name, grammatical_case)
+                found, value = self._lookup_known_inflection(name, grammatical_case, stored.get(key))
+                if found:
+                    inflections[key] = value
                 else:
-                    parsed_word = morph.parse(word)[0].inflect({grammatical_case})
-                    if parsed_word is not None:
-                        inflected_words.append(parsed_word.word)
-            return ' '.join(inflected_words)
+                    missing.add(name)
+        return inflections, missing
+
+    @api.model
+    def _precompute_inflections(self, phrases, grammatical_cases):
+        """ Inflect ``phrases`` in bulk, fanning cache misses out to a process pool.
+
+        :return: dict ``{(phrase, grammatical_case): value}``
+        """
+        cache_model = self.env['declension.ua.cache'].sudo()
+        inflections, missing = self._lookup_stored_inflections(phrases, grammatical_cases)
+        if not missing:
+            return inflections
+        processes = self._get_parallel_processes()
+        if processes and len(missing) >= PARALLEL_MIN_PHRASES:
+            rows = phrase.inflect_parallel(missing, grammatical_cases, processes)
+        else:
+            rows = [(name, grammatical_case, phrase.inflect_phrase(name, grammatical_case))
+                    for name in missing for grammatical_case in grammatical_cases]
+        rows = [row for row in rows if (row[0], row[1]) not in inflections]
+        _cache_stats["misses"] += len(rows)
+        cache_model._store_many(rows)
+        inflections.update(((name, grammatical_case), value) for name, grammatical_case, value in rows)
+        return inflections
+
+    @api.model
+    def _lookup_known_inflection(self, name, grammatical_case, stored):
+        """ Resolve an inflection without the analyzer.
+
+        Corrections made by hand in the cache table win over the shipped
+        lexicon, which wins over inflections cached from the analyzer.
+
+        :param stored: ``(value, manual)`` row of the cache table or None
+        :return: ``(found, value)``
+        """
+        if stored and stored[1]:
+            _cache_stats["db_hits"] += 1
+            return True, stored[0]
+        value = lexicon.lookup(name, grammatical_case)
+        if value is not None:
+            _cache_stats["lexicon_hits"] += 1
+            return True, phrase.match_case(name, value)
+        if stored:
+            _cache_stats["db_hits"] += 1
+            return True, stored[0]
+        return False, None
+
+    @api.model
+    def _get_manual_inflections(self):
+        cache_model = self.env['declension.ua.cache'].sudo()
+        version = cache_model._get_manual_version()
+        if version != _manual_inflections["version"]:
+            _manual_inflections["inflections"] = cache_model._load_manual()
+            _manual_inflections["version"] = version
+        return _manual_inflections["inflections"]
+
+    @api.model
+    def _inflect_phrase(self, name, grammatical_case):
+        """ Return the phrase ``name`` inflected in ``grammatical_case``. """
+        _cache_stats["lookups"] += 1
+        manual = self._get_manual_inflections()
+        if (name, grammatical_case) in manual:
+            _cache_stats["db_hits"] += 1
+            return manual[(name, grammatical_case)]
+        return self._inflect_phrase_cached(name, grammatical_case)
+
+    @tools.ormcache('name', 'grammatical_case')
+    def _inflect_phrase_cached(self, name, grammatical_case):
+        # Corrections made by hand are left to _inflect_phrase: only values
+        # that do not change while the process runs are kept here.
+        cache_model = self.env['declension.ua.cache'].sudo()
+        found, value, manual = cache_model._lookup(name, grammatical_case)
+        found, value = self._lookup_known_inflection(
+            name, grammatical_case, (value, False) if found and not manual else None)
+        if found:
+            return value
+        _cache_stats["misses"] += 1
+        value = phrase.inflect_phrase(name, grammatical_case)
+        cache_model._store(name, grammatical_case, value)
+        return value
+
+    @api.model
+    def _compute_inflected_field(self, value, grammatical_case, inflections=None):
+        """ Inflect ``value`` as a noun phrase.
+
+        ``inflections`` may hold already inflected phrases keyed by
+        ``(phrase, grammatical_case)``; other phrases are looked up in the cache.
+        Words that can not be inflected are kept as they are.
+        """
+        if isinstance(value, str):
+            name = ' '.join(value.split())
+            if not name:
+                return value
+            if inflections is not None and (name, grammatical_case) in inflections:
+                inflected_value = inflections[(name, grammatical_case)]
+            else:
+                inflected_value = self._inflect_phrase(name, grammatical_case)
+            return inflected_value or name
         else:
             return value
 
@@ -31,3 +230,47 @@ class DeclensionUA(models.AbstractModel):
             inflected_value = self._compute_inflected_field(record.name, grammatical_case)
             inflected_fields[f"name_{grammatical_case}"] = inflected_value
         return inflected_fields
+
+    @api.model
+    def get_declension_fields_batch(self, records, grammatical_cases, field_name='name'):
+        """ Inflect ``field_name`` of a whole recordset.
+
+        Every distinct name of the recordset is inflected once per case.
+
+        :return: dict ``{record.id: {'<field_name>_<case>': value, ...}}``
+        """
+        values = {record.id: record[field_name] for record in records}
+        phrases = {
+            ' '.join(value.split())
+            for value in values.values() if isinstance(value, str) and value.strip()
+        }
+        if self._is_deferred() and all(records._ids):
+            # Serve what is already known and queue the records of the other
+            # names; until the cron inflects them, they read the nominative.
+            inflections, missing = self._lookup_stored_inflections(phrases, grammatical_cases)
+            if missing:
+                pending = records.filtered(
+                    lambda record: isinstance(record[field_name], str)
+                    and ' '.join(record[field_name].split()) in missing)
+                self.env['declension.ua.queue']._enqueue(
+                    pending, [f"{field_name}_{grammatical_case}" for grammatical_case in grammatical_cases])
+                inflections.update(
+                    ((name, grammatical_case), name)
+                    for name in missing for grammatical_case in grammatical_cases
+                    if (name, grammatical_case) not in inflections)
+        elif self._get_parallel_processes():
+            inflections = self._precompute_inflections(phrases, grammatical_cases)
+        else:
+            inflections = {
+                (name, grammatical_case): self._inflect_phrase(name, grammatical_case)
+                for name in phrases
+                for grammatical_case in grammatical_cases
+            }
+        return {
+            record_id: {
+                f"{field_name}_{grammatical_case}": self._compute_inflected_field(
+                    value, grammatical_case, inflections)
+                for grammatical_case in grammatical_cases
+            }
+            for record_id, value in values.items()
+        }
@@ -0,0 +1,166 @@
+import logging
+
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+# Key of the version of the corrections made by hand in the transaction cache
+MANUAL_VERSION_KEY = 'declension_ua_manual_version'
+
+GRAMMATICAL_CASES = [
+    ('nomn', 'Nominative'),
+    ('gent', 'Genitive'),
+    ('datv', 'Dative'),
+    ('accs', 'Accusative'),
+    ('ablt', 'Ablative'),
+    ('loct', 'Locative'),
+    ('voct', 'Vocative'),
+]
+
+
+class DeclensionUACache(models.Model):
+    _name = 'declension.ua.cache'
+    _description = 'Declension Cache'
+    _order = 'word, grammatical_case'
+    _rec_name = 'word'
+
+    word = fields.Char(
+        string="Word or Phrase",
+        required=True,
+        index=True
+    )
+    grammatical_case = fields.Selection(
+        GRAMMATICAL_CASES,
+        string="Case",
+        required=True
+    )
+    value = fields.Char(
+        string="Inflection",
+        help="Inflected form of the word or phrase. Empty if it can not be inflected."
+    )
+    manual = fields.Boolean(
+        string="Corrected by Hand",
+        help="Manually corrected entries are kept when the cache is invalidated."
+    )
+
+    _sql_constraints = [
+        ("word_case_unique", "unique(word, grammatical_case)",
+         "Word inflection must be unique per grammatical case!"),
+    ]
+
+    def init(self):
+        # _get_manual_version() reads the corrections made by hand only
+        tools.create_index(self.env.cr, 'declension_ua_cache_manual_index', self._table,
+                           ['write_date'], where='manual')
+
+    @api.model
+    def _get_manual_version(self):
+        """ Return a value that changes whenever a correction made by hand is
+        added, changed or removed. It is read once per transaction.
+        """
+        cr = self.env.cr
+        # The cursor cache outlives commits: tag the version with the transaction
+        now = cr.now()
+        if cr.cache.get(MANUAL_VERSION_KEY, (None,))[0] != now:
+            cr.execute("""
+                SELECT count(*), max(id), max(write_date) FROM declension_ua_cache WHERE manual
+            """)
+            cr.cache[MANUAL_VERSION_KEY] = (now, cr.fetchone())
+        return cr.cache[MANUAL_VERSION_KEY][1]
+
+    @api.model
+    def _load_manual(self):
+        """ Return ``{(word, grammatical_case): value}`` of the corrections made by hand. """
+        self.env.cr.execute("""
+            SELECT word, grammatical_case, value FROM declension_ua_cache WHERE manual
+        """)
+        return {(word, grammatical_case): value for word, grammatical_case, value in self.env.cr.fetchall()}
+
+    @api.model
+    def _lookup(self, word, grammatical_case):
+        """ Return ``(found, value, manual)`` for the stored inflection of ``word``. """
+        self.env.cr.execute("""
+            SELECT value, manual FROM declension_ua_cache
+             WHERE word = %s AND grammatical_case = %s
+        """, (word, grammatical_case))
+        row = self.env.cr.fetchone()
+        return (True, row[0], row[1]) if row else (False, None, False)
+
+    @api.model
+    def _store(self, word, grammatical_case, value):
+        self._store_many([(word, grammatical_case, value)])
+
+    @api.model
+    def _lookup_many(self, words, grammatical_cases):
+        """ Return ``{(word, grammatical_case): (value, manual)}`` of the stored inflections. """
+        if not words or not grammatical_cases:
+            return {}
+        self.env.cr.execute("""
+            SELECT word, grammatical_case, value, manual FROM declension_ua_cache
+             WHERE word IN %s AND grammatical_case IN %s
+        """, (tuple(words), tuple(grammatical_cases)))
+        return {(word, grammatical_case): (value, manual)
+                for word, grammatical_case, value, manual in self.env.cr.fetchall()}
+
+    @api.model
+    def _store_many(self, rows):
+        """ Insert ``(word, grammatical_case, value)`` rows in bulk.
+
+        Storing is only a memo: several workers may inflect the same words
+        concurrently, and under repeatable read an insert conflicting with a
+        transaction committed since ours began fails with a serialization
+        error instead of being skipped. The rows are then dropped, in a
+        savepoint, rather than failing the request that inflected them.
+        """
+        if not rows:
+            return
+        try:
+            with self.env.cr.savepoint(flush=False):
+                execute_values(self.env.cr._obj, """
+                    INSERT INTO declension_ua_cache
+                           (word, grammatical_case, value, manual,
+                            create_uid, create_date, write_uid, write_date)
+                    VALUES %s
+                    ON CONFLICT (word, grammatical_case) DO NOTHING
+                """, rows, template="(%s, %s, %s, false, {uid}, now() at time zone 'UTC', "
+                                    "{uid}, now() at time zone 'UTC')".format(uid=int(self.env.uid)),
+                               page_size=1000)
+        except (errors.SerializationFailure, errors.DeadlockDetected) as error:
+            _logger.info("%s inflections not cached, stored concurrently: %s", len(rows), error)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            vals.setdefault('manual', True)
+        records = super().create(vals_list)
+        self.env.cr.cache.pop(MANUAL_VERSION_KEY, None)
+        return records
+
+    def write(self, vals):
+        if 'value' in vals:
+            vals = dict(vals, manual=vals.get('manual', True))
+        res = super().write(vals)
+        self.env.cr.cache.pop(MANUAL_VERSION_KEY, None)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.cr.cache.pop(MANUAL_VERSION_KEY, None)
+        return res
+
+    @api.model
+    def invalidate_words(self, words=None):
+        """ Drop automatically computed inflections of ``words`` (all if None).
+
+        Entries corrected by hand are kept. The in-memory caches only hold
+        inflections computed by the engines and the lexicon, which change
+        with them, that is when the workers restart.
+        """
+        domain = [('manual', '=', False)]
+        if words is not None:
+            domain.append(('word', 'in', list(words)))
+        self.search(domain).unlink()
+        return True
@@ -0,0 +1,85 @@
+import logging
+from collections import defaultdict
+
+from psycopg2.extras import execute_values
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Records recomputed by one run of the cron; the cron triggers itself again
+# while the queue is not empty.
+QUEUE_BATCH_SIZE = 500
+
+
+class DeclensionUAQueue(models.Model):
+    _name = 'declension.ua.queue'
+    _description = 'Pending Declension'
+    _order = 'id'
+    _rec_name = 'res_model'
+
+    res_model = fields.Char(
+        string="Model",
+        required=True,
+        index=True
+    )
+    res_id = fields.Integer(
+        string="Record ID",
+        required=True
+    )
+    field_names = fields.Char(
+        string="Fields",
+        required=True,
+        help="Comma-separated declension fields to recompute."
+    )
+
+    _sql_constraints = [
+        ("record_fields_unique", "unique(res_model, res_id, field_names)",
+         "Declension of a record can only be queued once!"),
+    ]
+
+    @api.model
+    def _enqueue(self, records, field_names):
+        """ Queue the declension ``field_names`` of ``records`` for the cron. """
+        if not records:
+            return
+        field_names = ','.join(field_names)
+        rows = [(records._name, record_id, field_names) for record_id in records.ids]
+        execute_values(self.env.cr._obj, """
+            INSERT INTO declension_ua_queue
+                   (res_model, res_id, field_names,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (res_model, res_id, field_names) DO NOTHING
+        """, rows, template="(%s, %s, %s, {uid}, now() at time zone 'UTC', "
+                            "{uid}, now() at time zone 'UTC')".format(uid=int(self.env.uid)),
+                       page_size=1000)
+        cron = self.env.ref('declension_ua.ir_cron_declension_queue', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_process_queue(self, limit=QUEUE_BATCH_SIZE):
+        """ Recompute the queued declension fields in synchronous mode. """
+        jobs = self.sudo().search([], limit=limit)
+        if not jobs:
+            return
+        groups = defaultdict(list)
+        for job in jobs:
+            groups[(job.res_model, job.field_names)].append(job.res_id)
+        for (res_model, field_names), res_ids in groups.items():
+            if res_model not in self.env:
+                continue
+            records = self.env[res_model].sudo().with_context(
+                declension_sync=True).browse(res_ids).exists()
+            names = [name for name in field_names.split(',') if name in records._fields]
+            for name in names:
+                self.env.add_to_compute(records._fields[name], records)
+            # Fields computed from the nominative stand-in (complete names)
+            # are recomputed too, on these records and on the related ones
+            records.modified(names)
+            self.env.flush_all()
+            _logger.info("declension of %s %s records recomputed", len(records), res_model)
+        jobs.unlink()
+        if self.sudo().search([], limit=1):
+            self.env.ref('declension_ua.ir_cron_declension_queue')._trigger()
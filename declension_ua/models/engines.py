@@ -0,0 +1,96 @@
+""" Lazily loaded declension engines.
+
+Neither pymorphy3 nor js2py is imported when the module is loaded: every
+engine is imported and initialised on its first use, once per process, and
+then shared by all threads of the worker. When an engine is loaded before the
+prefork workers are spawned, they share it through copy-on-write pages.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+_logger = logging.getLogger(__name__)
+
+
+def _load_pymorphy3():
+    pymorphy3 = importlib.import_module('pymorphy3')
+    return pymorphy3.MorphAnalyzer(lang='uk')
+
+
+def _load_shevchenko():
+    js2py = importlib.import_module('js2py')
+    return js2py.require("shevchenko")
+
+
+ENGINES = {
+    'pymorphy3': _load_pymorphy3,
+    'shevchenko': _load_shevchenko,
+}
+
+_lock = threading.Lock()
+_engines = {}
+_stats = {}
+
+
+def _reset_lock():
+    # A lock held by another thread at fork time would never be released in
+    # the child process.
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_lock)
+
+
+def get_engine(name):
+    """Return the process-wide instance of engine ``name``, loading it on first use."""
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+    loader = ENGINES[name]
+    with _lock:
+        engine = _engines.get(name)
+        if engine is None:
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            start = time.perf_counter()
+            engine = loader()
+            _stats[name] = {
+                "loaded": True,
+                "pid": os.getpid(),
+                "load_time": time.perf_counter() - start,
+                "rss_delta": process.memory_info().rss - rss_before,
+            }
+            _logger.info("declension engine %r loaded in %.3fs (+%.1f MiB RSS, pid %s)",
+                         name, _stats[name]["load_time"],
+                         _stats[name]["rss_delta"] / 1024 / 1024, _stats[name]["pid"])
+            _engines[name] = engine
+    return engine
+
+
+def get_analyzer():
+    """Return the process-wide Ukrainian pymorphy3 MorphAnalyzer."""
+    return get_engine('pymorphy3')
+
+
+def is_loaded(name):
+    return name in _engines
+
+
+def get_stats(name=None):
+    """Return load time (seconds) and resident memory growth (bytes) of the engines."""
+    if name:
+        return dict(_stats.get(name, {"loaded": False}))
+    return {engine: dict(_stats.get(engine, {"loaded": False})) for engine in ENGINES}
+
+
+def inflect_word(word, grammatical_case):
+    """Return ``word`` inflected in ``grammatical_case`` by pymorphy3 or None."""
+    parsed_word = get_analyzer().parse(word)[0].inflect({grammatical_case})
+    return parsed_word.word if parsed_word is not None else None
+
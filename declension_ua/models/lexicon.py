@@ -0,0 +1,66 @@
+""" Shipped military lexicon with precomputed inflections.
+
+``data/lexicon.tsv`` holds one ``word<TAB>case<TAB>inflection`` line per entry,
+lowercase and sorted by the UTF-8 bytes of the line. The file is memory-mapped
+and searched with a binary search over byte offsets, so a lookup neither parses
+the whole file nor keeps a Python copy of it.
+
+The file is generated by ``scripts/build_lexicon.py``; corrections go to
+``data/lexicon_overrides.tsv`` and are applied by the build.
+"""
+import mmap
+import os
+import threading
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'lexicon.tsv')
+
+_lock = threading.Lock()
+_mmap = None
+
+
+def _reset_lock():
+    # A lock held by another thread at fork time would never be released in
+    # the child process; the mapping itself is shared and stays valid.
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_lock)
+
+
+def _get_mmap():
+    global _mmap
+    if _mmap is None:
+        with _lock:
+            if _mmap is None:
+                with open(LEXICON_PATH, 'rb') as lexicon_file:
+                    if os.fstat(lexicon_file.fileno()).st_size:
+                        _mmap = mmap.mmap(lexicon_file.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        _mmap = b''
+    return _mmap
+
+
+def lookup(word, grammatical_case):
+    """ Return the shipped inflection of ``word`` (any letter case) or None. """
+    data = _get_mmap()
+    key = ('%s\t%s\t' % (word.lower(), grammatical_case)).encode()
+    low, high = 0, len(data)
+    # find the start of the first line >= key
+    while low < high:
+        middle = (low + high) // 2
+        start = data.rfind(b'\n', 0, middle) + 1
+        end = data.find(b'\n', start)
+        if end == -1:
+            end = len(data)
+        if data[start:end] < key:
+            low = end + 1
+        else:
+            high = start
+    if data[low:low + len(key)] != key:
+        return None
+    end = data.find(b'\n', low)
+    if end == -1:
+        end = len(data)
+    return data[low + len(key):end].decode()
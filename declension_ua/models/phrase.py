@@ -0,0 +1,161 @@
+""" Phrase-level declension of unit, job and company names.
+
+A name is inflected as a noun phrase rather than word by word: the head noun
+(the first noun in nominative) takes the requested case and the adjectives
+before it agree with it in case, gender and number. Everything after the head
+noun is a dependent ("командир взводу зв'язку") and is kept as is, as are
+numerals, abbreviations and quoted proper names.
+"""
+import logging
+import multiprocessing
+import time
+
+from . import engines, lexicon
+
+_logger = logging.getLogger(__name__)
+
+MODIFIER_TAGS = ('ADJF', 'PRTF', 'NUMR')
+QUOTES = ('"', '«', '„', '“', "'")
+DASHES = ('-', '–', '—')
+
+
+def _is_kept(token):
+    """ Numerals, abbreviations and codes are never inflected. """
+    word = token.strip('.,;:()')
+    return (not word
+            or any(char.isdigit() for char in word)
+            or '.' in word
+            or (len(word) > 1 and word.isupper()))
+
+
+def _nominative(parses, tags):
+    # Masculine nouns in nominative may come without a case in the dictionary
+    for parse in parses:
+        if any(tag in parse.tag for tag in tags) and parse.tag.case in (None, 'nomn'):
+            return parse
+    return None
+
+
+def match_case(source, inflected):
+    """ Give ``inflected`` the letter case of ``source`` (the analyzer lowercases). """
+    source_tokens = source.split()
+    inflected_tokens = inflected.split()
+    if len(source_tokens) != len(inflected_tokens):
+        if source[:1].isupper():
+            return inflected[:1].upper() + inflected[1:]
+        return inflected
+    result = []
+    for source_token, token in zip(source_tokens, inflected_tokens):
+        if len(source_token) > 1 and source_token.isupper():
+            token = token.upper()
+        elif source_token[:1].isupper():
+            token = token[:1].upper() + token[1:]
+        result.append(token)
+    return ' '.join(result)
+
+
+def _inflect_token(parse, grammemes):
+    inflected = parse.inflect(set(grammemes))
+    return inflected.word if inflected is not None else None
+
+
+def inflect_phrase(phrase, grammatical_case):
+    """ Return ``phrase`` inflected in ``grammatical_case``.
+
+    Parts separated by a dash ("Механік - водій") are apposed noun phrases
+    and are inflected separately. Words that can not be inflected are kept
+    unchanged, never dropped.
+    """
+    segments = [[]]
+    for token in phrase.split():
+        if token in DASHES:
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    return ' - '.join(
+        ' '.join(_inflect_noun_phrase(tokens, grammatical_case)) for tokens in segments
+    ) if len(segments) > 1 else ' '.join(_inflect_noun_phrase(segments[0], grammatical_case))
+
+
+def _inflect_noun_phrase(tokens, grammatical_case):
+    analyzer = engines.get_analyzer()
+    head = None
+    modifiers = []
+    for index, token in enumerate(tokens):
+        if token.startswith(QUOTES):
+            break
+        if _is_kept(token):
+            continue
+        parses = analyzer.parse(token)
+        parse = _nominative(parses, ('NOUN',) + MODIFIER_TAGS)
+        if parse is not None and 'NOUN' not in parse.tag and index == len(tokens) - 1:
+            # a trailing adjective is a substantivized one ("черговий")
+            parse = _nominative(parses, ('NOUN',)) or parse
+        if parse is None:
+            break
+        if 'NOUN' in parse.tag:
+            head = (index, parse)
+            break
+        modifiers.append((index, parse))
+
+    if head is None:
+        # Not a noun phrase: inflect what can be inflected, keep the rest
+        inflected_tokens = []
+        for token in tokens:
+            inflected = None if _is_kept(token) else engines.inflect_word(token, grammatical_case)
+            inflected_tokens.append(match_case(token, inflected) if inflected else token)
+        return inflected_tokens
+
+    head_index, noun = head
+    inflected_tokens = list(tokens)
+    head_word = (lexicon.lookup(tokens[head_index], grammatical_case)
+                 or _inflect_token(noun, {grammatical_case}))
+    if head_word:
+        inflected_tokens[head_index] = match_case(tokens[head_index], head_word)
+
+    plural = noun.tag.number == 'plur'
+    modifier_case = grammatical_case
+    if grammatical_case == 'accs' and noun.tag.animacy == 'inan' and (plural or noun.tag.gender == 'masc'):
+        # inanimate masculine and plural accusative equals nominative
+        modifier_case = 'nomn'
+    agreement = {modifier_case}
+    if plural:
+        agreement.add('plur')
+    elif noun.tag.gender:
+        agreement.add(noun.tag.gender)
+    for index, modifier in modifiers:
+        word = _inflect_token(modifier, agreement) or _inflect_token(modifier, {modifier_case})
+        if word:
+            inflected_tokens[index] = match_case(tokens[index], word)
+    return inflected_tokens
+
+
+def _inflect_chunk(args):
+    phrases, grammatical_cases = args
+    return [
+        (phrase, grammatical_case, inflect_phrase(phrase, grammatical_case))
+        for phrase in phrases
+        for grammatical_case in grammatical_cases
+    ]
+
+
+def inflect_parallel(phrases, grammatical_cases, processes, chunk_size=250):
+    """ Inflect ``phrases`` in every case of ``grammatical_cases`` with a process pool.
+
+    Pool processes are forked from the current worker, so they inherit its
+    analyzer when it is already loaded, and load their own otherwise.
+
+    :return: list of ``(phrase, grammatical_case, value)``
+    """
+    phrases = list(phrases)
+    # At least one chunk per process, never more than chunk_size phrases each
+    chunk_size = max(1, min(chunk_size, -(-len(phrases) // processes)))
+    chunks = [(phrases[index:index + chunk_size], list(grammatical_cases))
+              for index in range(0, len(phrases), chunk_size)]
+    start = time.perf_counter()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes, initializer=engines.get_analyzer) as pool:
+        result = [row for rows in pool.imap_unordered(_inflect_chunk, chunks) for row in rows]
+    _logger.info("inflected %s phrases in %s cases with %s processes in %.3fs",
+                 len(phrases), len(grammatical_cases), processes, time.perf_counter() - start)
+    return result
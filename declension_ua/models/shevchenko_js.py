@@ -1,5 +1,39 @@
+import functools
+
 from odoo import fields, models, api
-import js2py
+
+from . import engines
+
+# shevchenko-js function returning all name parts in the given case
+SHEVCHENKO_CASES = {
+    'gent': 'inGenitive',
+    'datv': 'inDative',
+    'ablt': 'inAblative',
+}
+
+
+@functools.lru_cache(maxsize=8192)
+def _decline_anthroponym(gender, last_name, first_name, middle_name):
+    # One interpreted JS call per case, memoized per process: personnel
+    # lists repeat the same names over and over.
+    shevchenko = engines.get_engine("shevchenko")
+    anthroponym = {
+        "gender": gender,
+        "lastName": last_name,
+        "firstName": first_name,
+        "middleName": middle_name,
+    }
+    declension = []
+    for grammatical_case, function in SHEVCHENKO_CASES.items():
+        result = getattr(shevchenko, function)(anthroponym)
+        declension.append((grammatical_case, "%s %s %s" % (
+            result["lastName"], result["firstName"], result["middleName"])))
+    return tuple(declension)
+
+
+def decline_anthroponym(gender, last_name, first_name, middle_name):
+    """ Return ``{case: 'Last First Middle'}`` for the cases of SHEVCHENKO_CASES. """
+    return dict(_decline_anthroponym(gender, last_name, first_name, middle_name))
 
 
 class Shevchenko(models.AbstractModel):
@@ -9,25 +43,13 @@ class Shevchenko(models.AbstractModel):
     name_gent = fields.Char(compute="_shevchenko_declension", store=True, string="Name Genitive")
     name_datv = fields.Char(compute="_shevchenko_declension", store=True, string="Name Dative")
     name_ablt = fields.Char(compute="_shevchenko_declension", store=True, string="Name Ablative")
-    shevchenko = js2py.require("shevchenko")
 
     @api.onchange ("gender", "first_name", "middle_name", "last_name")
     def _shevchenko_declension(self):
         for res in self:
-            shevchenko = js2py.require("shevchenko")
-            anthroponym = {
-                "gender": self.gender,
-                "lastName": self.last_name,
-                "firstName": self.first_name,
-                "middleName": self.middle_name,
-            }
-            if self.gender and self.first_name and self.last_name and self.middle_name:
-                res.name_gent = "%s %s %s" % ((shevchenko.inGenitive(anthroponym)["lastName"]),
-                                                (shevchenko.inGenitive(anthroponym)["firstName"]),
-                                                (shevchenko.inGenitive(anthroponym)["middleName"]))
-                res.name_datv = "%s %s %s" % ((shevchenko.inDative(anthroponym)["lastName"]),
-                                                (shevchenko.inDative(anthroponym)["firstName"]),
-                                                (shevchenko.inDative(anthroponym)["middleName"]))
-                res.name_ablt = "%s %s %s" % ((shevchenko.inAblative(anthroponym)["lastName"]),
-                                                (shevchenko.inAblative(anthroponym)["firstName"]),
-                                                (shevchenko.inAblative(anthroponym)["middleName"]))
+            if res.gender and res.first_name and res.last_name and res.middle_name:
+                declension = decline_anthroponym(res.gender, res.last_name,
+                                                 res.first_name, res.middle_name)
+                res.name_gent = declension['gent']
+                res.name_datv = declension['datv']
+                res.name_ablt = declension['ablt']
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+""" Measure the declension throughput of declension_ua.
+
+The benchmark loads the Odoo registry of a database where declension_ua is
+installed and inflects the demo vocabularies of military_hr (departments,
+jobs and employees) through ``_compute_inflected_field``,
+``get_declension_fields`` and the shevchenko path. For every scenario it
+reports words per second and the latency percentiles of one call; the cold
+start (engine loading, first inflection) and the peak RSS of the process are
+reported too. Results are written as sorted, indented JSON so that two runs
+can be compared with ``diff`` or with ``--baseline``.
+
+Nothing is committed: the benchmark runs in one transaction rolled back at
+the end. Options other than the ones below are passed to the Odoo server
+configuration::
+
+    python3 declension_ua/scripts/benchmark.py -c odoo.conf -d military \\
+        --output bench.json --baseline previous.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import types
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(MODULE_DIR)
+
+DEMO_DIR = 'military_hr/demo'
+DEPARTMENT_CSV = 'military.department.csv'
+JOB_CSV = 'military.job.csv'
+EMPLOYEE_CSV = 'military.employee.csv'
+
+GRAMMATICAL_CASES = ['gent', 'datv', 'ablt']
+
+
+def read_csv(root, file_name, columns):
+    with open(os.path.join(root, DEMO_DIR, file_name), encoding='utf-8') as csv_file:
+        return [tuple(row.get(column) or '' for column in columns)
+                for row in csv.DictReader(csv_file)]
+
+
+def read_names(root, file_name):
+    return [name for name, in read_csv(root, file_name, ['name']) if name.strip()]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def run(function, items, words):
+    """ Call ``function`` on every item; return the timings of the scenario. """
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        call_start = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {
+        'calls': len(items),
+        'words': words,
+        'seconds': round(elapsed, 6),
+        'words_per_sec': round(words / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 4),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 4),
+    }
+
+
+def clear_caches(env):
+    """ Forget every inflection computed by the analyzer (in memory and in the table). """
+    env['declension.ua.cache'].sudo().search([('manual', '=', False)]).unlink()
+    env.registry.clear_caches()
+
+
+def benchmark(env, root, repeat=1):
+    from odoo.addons.declension_ua.models import engines
+
+    declension = env['declension.ua']
+    names = read_names(root, DEPARTMENT_CSV) + read_names(root, JOB_CSV)
+    employees = [row for row in read_csv(
+        root, EMPLOYEE_CSV, ['gender', 'last_name', 'first_name', 'middle_name']) if all(row)]
+    calls = [(name, grammatical_case) for name in names for grammatical_case in GRAMMATICAL_CASES]
+    call_words = sum(len(name.split()) for name, _case in calls)
+    records = [types.SimpleNamespace(name=name) for name in names]
+    record_words = sum(len(name.split()) for name in names) * len(GRAMMATICAL_CASES)
+
+    results = {
+        'dataset': {
+            'names': len(names),
+            'distinct_names': len(set(names)),
+            'employees': len(employees),
+            'cases': GRAMMATICAL_CASES,
+        },
+        'scenarios': {},
+    }
+
+    clear_caches(env)
+    start = time.perf_counter()
+    declension._compute_inflected_field(names[0], GRAMMATICAL_CASES[0])
+    results['cold_start'] = {
+        'first_call_seconds': round(time.perf_counter() - start, 6),
+        'engines': engines.get_stats(),
+    }
+
+    scenarios = results['scenarios']
+    for iteration in range(repeat):
+        clear_caches(env)
+        scenarios.setdefault('compute_inflected_field_cold', []).append(run(
+            lambda call: declension._compute_inflected_field(*call), calls, call_words))
+        scenarios.setdefault('compute_inflected_field_warm', []).append(run(
+            lambda call: declension._compute_inflected_field(*call), calls, call_words))
+        clear_caches(env)
+        scenarios.setdefault('get_declension_fields_cold', []).append(run(
+            lambda record: declension.get_declension_fields(record, GRAMMATICAL_CASES),
+            records, record_words))
+
+    try:
+        engines.get_engine('shevchenko')
+    except Exception as error:
+        results['shevchenko'] = {'skipped': str(error)}
+    else:
+        from odoo.addons.declension_ua.models import shevchenko_js
+        for iteration in range(repeat):
+            shevchenko_js._decline_anthroponym.cache_clear()
+            scenarios.setdefault('shevchenko_cold', []).append(run(
+                lambda row: shevchenko_js.decline_anthroponym(*row),
+                employees, 3 * len(employees) * len(shevchenko_js.SHEVCHENKO_CASES)))
+
+    # Keep the best run of every scenario: the least disturbed by the host
+    results['scenarios'] = {
+        name: min(runs, key=lambda timing: timing['seconds']) for name, runs in scenarios.items()
+    }
+    results['cache_stats'] = declension.get_cache_stats()
+    results['peak_rss'] = peak_rss()
+    return results
+
+
+def compare(results, baseline):
+    lines = []
+    for name, timing in sorted(results['scenarios'].items()):
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous.get('words_per_sec') or not timing['words_per_sec']:
+            lines.append('%-32s %12s words/s' % (name, timing['words_per_sec']))
+            continue
+        change = (timing['words_per_sec'] / previous['words_per_sec'] - 1) * 100
+        lines.append('%-32s %12s words/s (%+.1f%%), p95 %s ms (was %s)' % (
+            name, timing['words_per_sec'], change, timing['p95_ms'], previous['p95_ms']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--root', default=ROOT_DIR, help="repository root with the military addons")
+    parser.add_argument('--output', default='declension_benchmark.json', help="JSON file to write")
+    parser.add_argument('--baseline', help="JSON results of a previous run to compare with")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of every scenario, the best is kept")
+    args, odoo_args = parser.parse_known_args()
+
+    import odoo
+    from odoo import SUPERUSER_ID, api
+
+    odoo.tools.config.parse_config(odoo_args)
+    # Load engines on first use so that the cold start is measured here
+    odoo.tools.config['declension_preload'] = ''
+    dbname = odoo.tools.config['db_name']
+    if not dbname:
+        parser.error("the database must be given with -d")
+
+    start = time.perf_counter()
+    registry = odoo.registry(dbname)
+    registry_seconds = time.perf_counter() - start
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {'declension_sync': True})
+        try:
+            results = benchmark(env, args.root, max(1, args.repeat))
+        finally:
+            cr.rollback()
+
+    results['cold_start']['registry_seconds'] = round(registry_seconds, 6)
+    results['environment'] = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'odoo': odoo.release.version,
+        'cpu_count': os.cpu_count(),
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True, ensure_ascii=False)
+        output_file.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            print(compare(results, json.load(baseline_file)))
+    else:
+        print(compare(results, {}))
+    print("peak RSS %.1f MiB, results written to %s" % (results['peak_rss'] / 1024 / 1024, args.output))
+
+
+if __name__ == '__main__':
+    main()
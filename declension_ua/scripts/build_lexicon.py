@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+""" Regenerate declension_ua/data/lexicon.tsv.
+
+The vocabulary is collected from the data and demo CSVs of the military
+addons (ranks, departments, jobs). Words are inflected with pymorphy3 in
+every grammatical case, then overridden by the hand-made rank declensions of
+military.rank.csv and finally by data/lexicon_overrides.tsv. Multi-word rank
+names are also stored whole, so that phrase lookups find them directly.
+
+Usage (from the repository root)::
+
+    python3 declension_ua/scripts/build_lexicon.py
+"""
+import argparse
+import csv
+import os
+import re
+
+import pymorphy3
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(MODULE_DIR)
+
+CASES = ['nomn', 'gent', 'datv', 'accs', 'ablt', 'loct', 'voct']
+RANK_CASES = ['gent', 'datv', 'ablt']
+
+RANK_CSV = 'military_rank/data/military.rank.csv'
+RANK_PO = 'military_rank/i18n/uk_UA.po'
+NAME_CSVS = [
+    'military_department/demo/hr.department.csv',
+    'military_job/demo/hr.job.csv',
+    'military_hr/demo/military.department.csv',
+    'military_hr/demo/military.job.csv',
+]
+OVERRIDES = os.path.join(MODULE_DIR, 'data', 'lexicon_overrides.tsv')
+OUTPUT = os.path.join(MODULE_DIR, 'data', 'lexicon.tsv')
+
+WORD_RE = re.compile(r"^[^\W\d_]+(?:[-'’][^\W\d_]+)*$")
+
+
+def _is_word(token):
+    # Skip numbers, codes and abbreviations: they are never inflected
+    return bool(WORD_RE.match(token)) and not (len(token) > 1 and token.isupper())
+
+
+def read_rank_names(root):
+    """ Return ``{xml id: ukrainian name}`` from the rank translations. """
+    names = {}
+    xml_id = None
+    with open(os.path.join(root, RANK_PO), encoding='utf-8') as po_file:
+        for line in po_file:
+            match = re.match(r'#: model:military\.rank,name:military_rank\.(\S+)', line)
+            if match:
+                xml_id = match.group(1)
+            elif xml_id and line.startswith('msgstr'):
+                value = line.split(' ', 1)[1].strip().strip('"')
+                if value:
+                    names[xml_id] = value
+                xml_id = None
+    return names
+
+
+def read_ranks(root):
+    """ Return ``{(word or phrase, case): inflection}`` taken from the hand-made rank declensions. """
+    names = read_rank_names(root)
+    entries = {}
+    with open(os.path.join(root, RANK_CSV), encoding='utf-8') as csv_file:
+        for row in csv.DictReader(csv_file):
+            name = names.get(row.get('id') or '')
+            if not name:
+                continue
+            words = name.lower().split()
+            for grammatical_case in RANK_CASES:
+                inflected = (row.get('name_%s' % grammatical_case) or '').split()
+                if len(inflected) != len(words):
+                    continue
+                if len(words) > 1:
+                    # the whole rank name, served to phrase lookups as is
+                    entries[(' '.join(words), grammatical_case)] = ' '.join(inflected).lower()
+                for word, inflected_word in zip(words, inflected):
+                    if _is_word(word):
+                        entries[(word, grammatical_case)] = inflected_word.lower()
+            for word in words:
+                if _is_word(word):
+                    entries[(word, 'nomn')] = word
+            if len(words) > 1:
+                entries[(' '.join(words), 'nomn')] = ' '.join(words)
+    return entries
+
+
+def read_vocabulary(root):
+    words = set()
+    for path in NAME_CSVS:
+        full_path = os.path.join(root, path)
+        if not os.path.exists(full_path):
+            continue
+        with open(full_path, encoding='utf-8') as csv_file:
+            for row in csv.DictReader(csv_file):
+                for token in (row.get('name') or '').split():
+                    token = token.strip('"«»(),.')
+                    if _is_word(token):
+                        words.add(token.lower())
+    return words
+
+
+def read_overrides(path):
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding='utf-8') as overrides_file:
+        for line in overrides_file:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            word, grammatical_case, value = line.split('\t')
+            entries[(word.lower(), grammatical_case)] = value.lower()
+    return entries
+
+
+def build(root=ROOT_DIR, output=OUTPUT, overrides=OVERRIDES):
+    analyzer = pymorphy3.MorphAnalyzer(lang='uk')
+    ranks = read_ranks(root)
+    words = read_vocabulary(root) | {word for word, _case in ranks if ' ' not in word}
+    entries = {}
+    for word in words:
+        parsed_word = analyzer.parse(word)[0]
+        for grammatical_case in CASES:
+            inflected = parsed_word.inflect({grammatical_case})
+            if inflected is not None:
+                entries[(word, grammatical_case)] = inflected.word
+    entries.update(ranks)
+    entries.update(read_overrides(overrides))
+    lines = sorted(('%s\t%s\t%s\n' % (word, grammatical_case, value)).encode()
+                   for (word, grammatical_case), value in entries.items())
+    with open(output, 'wb') as lexicon_file:
+        lexicon_file.writelines(lines)
+    return len(words), len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--root', default=ROOT_DIR, help="repository root with the military addons")
+    parser.add_argument('--output', default=OUTPUT, help="lexicon file to write")
+    args = parser.parse_args()
+    words, lines = build(args.root, args.output)
+    print("%s words, %s entries written to %s" % (words, lines, args.output))
+
+
+if __name__ == '__main__':
+    main()
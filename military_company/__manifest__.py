@@ -13,8 +13,10 @@
                 "declension_ua",
                 ],
     "data": [
-        # "security/ir.model.access.csv",
-        "views/res_company.xml"
+        "security/ir.model.access.csv",
+        "data/ir_cron_data.xml",
+        "views/res_company.xml",
+        "views/res_company_rename_job_views.xml",
     ],
     "sequence": '1',
     "demo": ["demo/res.company.csv"],
@@ -1 +1,4 @@
+from . import department_tree
+from . import order_scheduler
 from . import res_company
+from . import res_company_rename_job
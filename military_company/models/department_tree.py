@@ -0,0 +1,371 @@
+import logging
+from collections import defaultdict, namedtuple
+
+from odoo import api, models, tools
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+# A subtree rebuild runs one UPDATE per department level
+COMPLETE_NAME_STATEMENTS_PER_LEVEL = 1
+
+# Fields of the department tree snapshot
+TREE_SNAPSHOT_FIELDS = ['parent_id', 'level', 'sequence', 'name', 'code', 'complete_name',
+                        'company_id', 'active']
+# Fields whose change makes the snapshot stale, once computed fields are flushed
+TREE_DEPENDENCIES = set(TREE_SNAPSHOT_FIELDS) | {'name_gent'}
+# Key of the department models changed in the transaction, in the cursor cache
+TREE_CHANGED_KEY = '%s.tree_changed' % __name__
+
+TreeNode = namedtuple('TreeNode', ['parent_id', 'level', 'sequence', 'name', 'code',
+                                   'display_name', 'active'])
+
+
+class DepartmentTreeMixin(models.AbstractModel):
+    """ Department hierarchy shared by ``hr.department`` and ``military.department``.
+
+    Inheriting models have ``name``, ``name_gent``, ``code``, ``sequence``,
+    ``level``, ``active``, ``company_id``, ``parent_id``, ``parent_path``,
+    ``complete_name`` and ``complete_name_gent`` fields.
+
+    The per-company snapshot of the tree is kept in the ormcache. A
+    transaction changing departments stops using it until its commit, which
+    clears the ormcache; the other workers clear theirs on the next request.
+    """
+    _name = "military.department.tree.mixin"
+    _description = "Department Tree"
+
+    # Snapshot
+
+    @api.model
+    def _format_display_name(self, code, complete_name):
+        complete_name = (complete_name or '').upper()
+        return "[%s] %s" % (code, complete_name) if code else complete_name
+
+    def _invalidate_tree_snapshot(self):
+        """ Keep the snapshots of the model out of the rest of the transaction,
+        they do not hold its changes, and drop them once it is committed.
+        """
+        cr = self.env.cr
+        changed = cr.cache.setdefault(TREE_CHANGED_KEY, set())
+        if self._name in changed:
+            return
+        if not changed:
+            cr.postcommit.add(changed.clear)
+            cr.postrollback.add(changed.clear)
+        changed.add(self._name)
+        cr.postcommit.add(self.clear_caches)
+
+    def _tree_changed(self):
+        return self._name in self.env.cr.cache.get(TREE_CHANGED_KEY, ())
+
+    @api.model
+    def _read_tree_snapshot(self, company_id):
+        """ Return ``{id: TreeNode}`` of the departments of ``company_id``
+        (without company if False), archived ones included.
+        """
+        self.flush_model(TREE_SNAPSHOT_FIELDS)
+        self.env.cr.execute("""
+            SELECT id, parent_id, level, sequence, name, code, complete_name, active
+              FROM {table}
+             WHERE company_id IS NOT DISTINCT FROM %s
+        """.format(table=self._table), [company_id or None])
+        return {
+            department_id: TreeNode(parent_id, level, sequence, name, code,
+                                    self._format_display_name(code, complete_name), active)
+            for department_id, parent_id, level, sequence, name, code, complete_name, active
+            in self.env.cr.fetchall()
+        }
+
+    @tools.ormcache('company_id')
+    def _get_tree_snapshot(self, company_id):
+        """ Cached ``_read_tree_snapshot``, shared by all requests of the
+        worker; it must not be modified.
+        """
+        return self._read_tree_snapshot(company_id)
+
+    @tools.ormcache('self.env.uid', 'company_id', 'tuple(self.env.companies.ids)')
+    def _get_tree_readable_ids(self, company_id):
+        """ Ids of the cached snapshot the record rules let the user read. """
+        snapshot = self._get_tree_snapshot(company_id)
+        return frozenset(self.browse(list(snapshot))._filter_access_rules('read')._ids)
+
+    @api.model
+    def _get_readable_tree(self, company_id):
+        """ Return the snapshot of ``company_id`` and the ids of it the user may read. """
+        if self._tree_changed():
+            snapshot = self._read_tree_snapshot(company_id)
+            if self.env.su:
+                return snapshot, snapshot
+            return snapshot, set(self.browse(list(snapshot))._filter_access_rules('read')._ids)
+        snapshot = self._get_tree_snapshot(company_id)
+        if self.env.su:
+            return snapshot, snapshot
+        return snapshot, self._get_tree_readable_ids(company_id)
+
+    @api.model
+    def get_department_tree(self, company_id=None):
+        """ Return ``{id: TreeNode}`` of the departments of a company, the
+        current one by default, restricted to the departments the user may read.
+        """
+        self.check_access_rights('read')
+        if company_id is None:
+            company_id = self.env.company.id
+        snapshot, readable = self._get_readable_tree(company_id)
+        return {department_id: node for department_id, node in snapshot.items()
+                if department_id in readable}
+
+    def _get_tree_children(self):
+        """ Return ``{department id: children}`` of the active departments of
+        the companies of ``self``, ordered as the departments are.
+        """
+        children = defaultdict(list)
+        for company_id in {department.company_id.id for department in self}:
+            for department_id, node in self.get_department_tree(company_id).items():
+                if node.active and node.parent_id:
+                    children[node.parent_id].append((node.sequence or 0, node.name or '', department_id))
+        return {parent_id: self.browse([department_id for _sequence, _name, department_id in sorted(nodes)])
+                for parent_id, nodes in children.items()}
+
+    def name_get(self):
+        self.check_access_rights('read')
+        names = {}
+        if not self._tree_changed():
+            # Only the allowed companies are looked up, as the multi-company
+            # rule would; the departments the snapshot does not serve go
+            # through the fields, which raise as usual.
+            remaining = {department_id for department_id in self._ids if isinstance(department_id, int)}
+            for company_id in self.env.companies.ids + [False]:
+                if not remaining:
+                    break
+                snapshot, readable = self._get_readable_tree(company_id)
+                found = {department_id for department_id in remaining
+                         if department_id in snapshot and department_id in readable}
+                names.update((department_id, snapshot[department_id].display_name)
+                             for department_id in found)
+                remaining -= found
+        res = []
+        for dep in self:
+            if dep.id not in names:
+                names[dep.id] = self._format_display_name(dep.code, dep.complete_name)
+            res.append((dep.id, names[dep.id]))
+        return res
+
+    @api.model
+    def name_search(self, name, args=None, operator="ilike", limit=100):
+        args = args or []
+        if name and operator == 'ilike':
+            return self.browse(self._search_ranked(name, args, limit)).name_get()
+        domain = []
+        if name:
+            domain = ["|", ("code", "=ilike", name + "%"), ("name", operator, name)]
+            if operator in expression.NEGATIVE_TERM_OPERATORS:
+                domain = ["&", "!"] + domain[1:]
+        departments = self.search(domain + args, limit=limit)
+        return departments.name_get()
+
+    @api.model
+    def _search_ranked(self, name, args=None, limit=100):
+        """ Return the ids of the departments matching ``name`` by code prefix
+        or by name, best matches first: exact code, code prefix, then name
+        similarity.
+
+        The code condition is written on ``lower(code)`` to use the prefix
+        index, the name conditions use the trigram indexes.
+        """
+        query = self._search(args or [])
+        from_clause, where_clause, where_params = query.get_sql()
+        table = '"%s"' % self._table
+        term = name.strip()
+        prefix = tools.escape_psql(term.lower()) + '%'
+        pattern = '%' + tools.escape_psql(term) + '%'
+        if self.env.registry.has_trigram:
+            similarity = "GREATEST(similarity({t}.name, %s), similarity({t}.complete_name, %s)) DESC".format(t=table)
+            similarity_params = [term, term]
+        else:
+            similarity = "length({t}.complete_name)".format(t=table)
+            similarity_params = []
+        self.env.cr.execute("""
+            SELECT {t}.id FROM {from_clause}
+             WHERE ({where_clause})
+               AND (lower({t}.code) LIKE %s
+                    OR {t}.name ILIKE %s
+                    OR {t}.complete_name ILIKE %s)
+             ORDER BY COALESCE(lower({t}.code) = %s, false) DESC,
+                      COALESCE(lower({t}.code) LIKE %s, false) DESC,
+                      {similarity},
+                      {t}.level, {t}.sequence, {t}.id
+             LIMIT %s
+        """.format(t=table, from_clause=from_clause, where_clause=where_clause or 'TRUE',
+                   similarity=similarity),
+            where_params + [prefix, pattern, pattern, term.lower(), prefix] + similarity_params + [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    # Subtrees
+
+    def _get_subtree_records(self, comodel_name, inverse_name='department_id'):
+        """ Return ``{department id: records}`` of ``comodel_name`` attached to
+        every department of ``self`` or to any of its descendants.
+
+        One grouped query on ``parent_path`` prefixes collects the ids of the
+        whole recordset, one search then applies active flags, record rules
+        and the order of ``comodel_name``.
+        """
+        comodel = self.env[comodel_name]
+        department_ids = {department._origin.id for department in self if department._origin.id}
+        result = {department_id: comodel.browse() for department_id in department_ids}
+        if not department_ids:
+            return result
+        self.flush_model(['parent_path'])
+        comodel.flush_model([inverse_name])
+        self.env.cr.execute("""
+            SELECT department.id, array_agg(record.id)
+              FROM {department_table} department
+              JOIN {department_table} child
+                ON child.parent_path LIKE department.parent_path || '%%'
+              JOIN {record_table} record ON record.{inverse_name} = child.id
+             WHERE department.id IN %s
+             GROUP BY department.id
+        """.format(department_table=self._table, record_table=comodel._table,
+                   inverse_name=inverse_name), [tuple(department_ids)])
+        rows = self.env.cr.fetchall()
+        record_ids = {record_id for _department_id, ids in rows for record_id in ids}
+        records = comodel.search([('id', 'in', list(record_ids))])
+        position = {record_id: index for index, record_id in enumerate(records._ids)}
+        for department_id, ids in rows:
+            result[department_id] = comodel.browse(sorted(
+                (record_id for record_id in ids if record_id in position),
+                key=position.get))
+        return result
+
+    # Complete names
+
+    @api.model
+    def _format_complete_names(self, name, name_gent, has_parent,
+                               parent_complete_name_gent, company_name_gent):
+        """ Return ``(complete_name, complete_name_gent)`` of a department. """
+        if has_parent and parent_complete_name_gent:
+            complete_name = "%s %s" % (name, parent_complete_name_gent)
+        else:
+            complete_name = "%s %s" % (name, company_name_gent)
+        if not name_gent:
+            if not has_parent:
+                complete_name_gent = name_gent
+            else:
+                complete_name_gent = parent_complete_name_gent
+        else:
+            if has_parent and parent_complete_name_gent:
+                complete_name_gent = "%s %s" % (name_gent, parent_complete_name_gent)
+            else:
+                complete_name_gent = "%s %s" % (name_gent, company_name_gent)
+        return complete_name, complete_name_gent
+
+    def _rebuild_complete_names(self):
+        """ Recompute complete_name and complete_name_gent of the subtrees of
+        ``self`` in bulk, instead of one department at a time through the ORM.
+
+        Departments are processed level by level, parents first, with a
+        single UPDATE per level. Jobs and employees depending on the complete
+        names are then recomputed by the ORM as usual.
+
+        :return: the largest number of statements run for a level
+        """
+        department_ids = [department.id for department in self if department.id]
+        if not department_ids:
+            return 0
+        self.flush_model(['name', 'name_gent', 'parent_id', 'parent_path', 'company_id', 'level'])
+        self.env['res.company'].flush_model(['name_gent'])
+        cr = self.env.cr
+        cr.execute("""
+            SELECT department.id, department.parent_id, department.level,
+                   department.name, department.name_gent, company.name_gent,
+                   parent.complete_name_gent,
+                   department.complete_name, department.complete_name_gent
+              FROM {table} department
+              LEFT JOIN {table} parent ON parent.id = department.parent_id
+              LEFT JOIN res_company company ON company.id = department.company_id
+             WHERE department.parent_path LIKE ANY (
+                   SELECT parent_path || '%%' FROM {table} WHERE id IN %s)
+             ORDER BY department.level, department.id
+        """.format(table=self._table), [tuple(department_ids)])
+        levels = {}
+        for row in cr.fetchall():
+            # NULL columns read as False, like the ORM does
+            row = [False if value is None else value for value in row]
+            levels.setdefault(row[2], []).append(row)
+
+        complete_names_gent = {}
+        subtree_ids = []
+        statements = 0
+        for level, rows in sorted(levels.items()):
+            values = []
+            for (department_id, parent_id, _level, name, name_gent, company_name_gent,
+                 parent_complete_name_gent, complete_name, complete_name_gent) in rows:
+                subtree_ids.append(department_id)
+                if parent_id in complete_names_gent:
+                    parent_complete_name_gent = complete_names_gent[parent_id]
+                new_names = self._format_complete_names(
+                    name, name_gent, bool(parent_id), parent_complete_name_gent, company_name_gent)
+                complete_names_gent[department_id] = new_names[1]
+                if new_names != (complete_name, complete_name_gent):
+                    values.append((department_id,) + tuple(value or None for value in new_names))
+            if not values:
+                continue
+            # the cursor counts every statement it executes
+            count = cr.sql_log_count
+            cr.execute("""
+                UPDATE {table} department
+                   SET complete_name = new.complete_name,
+                       complete_name_gent = new.complete_name_gent,
+                       write_uid = %s,
+                       write_date = now() at time zone 'UTC'
+                  FROM (VALUES {values}) AS new (id, complete_name, complete_name_gent)
+                 WHERE department.id = new.id
+            """.format(table=self._table, values=', '.join(
+                cr.mogrify("(%s, %s, %s)", row).decode() for row in values)), [self.env.uid])
+            statements = max(statements, cr.sql_log_count - count)
+            if cr.sql_log_count - count > COMPLETE_NAME_STATEMENTS_PER_LEVEL:
+                _logger.warning("complete names of level %s took %s statements",
+                                level, cr.sql_log_count - count)
+
+        subtree = self.browse(subtree_ids)
+        names = ['complete_name', 'complete_name_gent']
+        # Mark jobs and employees depending on the complete names, but keep
+        # the departments themselves out of the ORM recomputation
+        subtree.modified(names)
+        for name in names:
+            self.env.remove_to_compute(self._fields[name], subtree)
+        subtree.invalidate_recordset(names)
+        self._invalidate_tree_snapshot()
+        _logger.info("complete names of %s departments rebuilt in %s levels, "
+                     "at most %s statement(s) per level",
+                     len(subtree), len(levels), statements)
+        return statements
+
+    # CRUD
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        departments = super().create(vals_list)
+        self._invalidate_tree_snapshot()
+        return departments
+
+    def write(self, vals):
+        if TREE_DEPENDENCIES & set(vals):
+            self._invalidate_tree_snapshot()
+        res = super().write(vals)
+        if {'name', 'name_gent', 'parent_id', 'company_id'} & set(vals):
+            self._rebuild_complete_names()
+        return res
+
+    def _write(self, vals):
+        # Stored computed fields (complete_name, level, code) are written here
+        # when they are recomputed, without going through write()
+        if TREE_DEPENDENCIES & set(vals):
+            self._invalidate_tree_snapshot()
+        return super()._write(vals)
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_tree_snapshot()
+        return res
@@ -0,0 +1,119 @@
+import logging
+import threading
+from datetime import datetime, time
+
+from odoo import _, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Orders applied by one run of a scheduler cron; the cron triggers itself
+# again while due orders remain.
+ORDER_BATCH_SIZE = 50
+
+
+class OrderSchedulerMixin(models.AbstractModel):
+    """ Apply confirmed orders once their date has come.
+
+    Inheriting models have ``state`` and ``date`` fields and a ``state_done``
+    method; ``_order_scheduler_cron`` is the xml id of their scheduler cron and
+    ``_order_line_field`` the name of their one2many of lines.
+    """
+    _name = "military.order.scheduler.mixin"
+    _description = "Scheduled Order Application"
+    _order_scheduler_cron = None
+    _order_line_field = None
+
+    schedule_error = fields.Text(
+        'Scheduling Error',
+        readonly=True,
+        copy=False,
+        help="Why the order could not be applied on its date. "
+             "The scheduler skips it until it is confirmed again."
+    )
+
+    def write(self, vals):
+        # A failed order is scheduled again when its status changes
+        if 'state' in vals and 'schedule_error' not in vals:
+            vals = dict(vals, schedule_error=False)
+        return super().write(vals)
+
+    @api.model
+    def _get_today(self):
+        """ Today in the timezone of the current company, the date the
+        scheduler and ``state_done`` both compare the orders with.
+        """
+        tz = self.env.company.partner_id.tz or self.env.context.get('tz')
+        return fields.Date.context_today(self.with_context(tz=tz))
+
+    def _is_due(self):
+        self.ensure_one()
+        return self.date <= self._get_today()
+
+    def _schedule(self):
+        """ Leave the orders confirmed and wake the scheduler up on their date. """
+        self.write({'state': 'confirm'})
+        cron = self.env.ref(self._order_scheduler_cron, raise_if_not_found=False)
+        if cron:
+            for date in set(self.mapped('date')):
+                cron.sudo()._trigger(at=datetime.combine(date, time.min))
+
+    @api.model
+    def _get_due_orders_domain(self):
+        return [
+            ('state', '=', 'confirm'),
+            ('date', '<=', self._get_today()),
+            ('schedule_error', '=', False),
+        ]
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+
+    @api.model
+    def _cron_apply_orders(self, limit=ORDER_BATCH_SIZE):
+        """ Apply the due orders, oldest first, each one in its own savepoint.
+
+        An order that fails is rolled back alone and keeps its error in
+        ``schedule_error``; the following orders are applied anyway.
+        """
+        orders = self.search(self._get_due_orders_domain(), order='date, id', limit=limit)
+        applied = 0
+        for order in orders:
+            try:
+                with self.env.cr.savepoint():
+                    if order.state_done() is False:
+                        raise ValueError(_("The order was not applied."))
+                applied += 1
+            except Exception as error:
+                _logger.warning("scheduled %s %s failed: %s", self._description, order.id, error)
+                order.schedule_error = str(error) or error.__class__.__name__
+        self._commit()
+        _logger.info("%s of %s scheduled %s applied", applied, len(orders), self._description)
+        if len(orders) == limit:
+            self.env.ref(self._order_scheduler_cron)._trigger()
+
+    @api.model
+    def _get_last_done_orders(self, employees):
+        """ Return the last done order of each of ``employees``, by date.
+
+        One query for the whole recordset, whatever its size; the state is
+        read from the order itself.
+
+        :return: dict ``{employee_id: order_id}`` of the employees with a done order
+        """
+        employee_ids = employees._origin.ids
+        if not employee_ids:
+            return {}
+        field = self._fields[self._order_line_field]
+        lines = self.env[field.comodel_name]
+        lines.flush_model(['employee_id', field.inverse_name])
+        self.flush_model(['state', 'date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (line.employee_id) line.employee_id, orders.id
+              FROM {line_table} line
+              JOIN {order_table} orders ON orders.id = line.{inverse_name}
+             WHERE line.employee_id IN %s AND orders.state = 'done'
+             ORDER BY line.employee_id, orders.date DESC, orders.id DESC
+        """.format(line_table=lines._table, order_table=self._table,
+                   inverse_name=field.inverse_name), [tuple(employee_ids)])
+        return dict(self.env.cr.fetchall())
@@ -1,4 +1,4 @@
-from odoo import fields, models, api
+from odoo import fields, models, api, tools
 
 
 class Company(models.Model):
@@ -27,12 +27,59 @@ class Company(models.Model):
     code = fields.Char('Code', store=True)
     commandor = fields.Many2one('hr.job', 'Commandor')
     staff_chief = fields.Many2one('hr.job', 'Chief of Staff')
+    names_stale = fields.Boolean(
+        'Names Outdated',
+        readonly=True,
+        help="The company was renamed and the complete names of its departments, "
+             "jobs and employees are still being updated in background."
+    )
+    rename_job_ids = fields.One2many('res.company.rename.job', 'company_id', 'Rename Jobs')
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
+
+    @api.model
+    def _get_rename_targets(self):
+        """ Return the ``(model, field names, order)`` whose values derive from
+        the company name, in the order they must be recomputed.
+
+        Modules adding such fields extend the list; the records of a target
+        are the ones of the renamed company (``company_id``).
+        """
+        return []
+
+    def _defer_rename(self, vals):
+        # The context key or the system parameter propagate renames synchronously
+        if 'name' not in vals and 'name_gent' not in vals:
+            return False
+        if 'company_rename_sync' in self.env.context:
+            return not self.env.context['company_rename_sync']
+        return not tools.str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'military_company.company_rename_sync', 'False'), False)
+
+    def write(self, vals):
+        if not self._defer_rename(vals) or not self._get_rename_targets():
+            return super().write(vals)
+        names_gent = {company.id: company.name_gent for company in self}
+        res = super().write(vals)
+        self.flush_recordset(['name_gent'])
+        renamed = self.filtered(lambda company: company.name_gent != names_gent[company.id])
+        if renamed:
+            renamed._queue_rename_propagation()
+        return res
+
+    def _queue_rename_propagation(self):
+        """ Leave the recomputation of the names depending on the company
+        name to a background job instead of the current request.
+        """
+        for model_name, field_names, _order in self._get_rename_targets():
+            records = self.env[model_name].with_context(active_test=False).search(
+                [('company_id', 'in', self.ids)])
+            for field_name in field_names:
+                self.env.remove_to_compute(records._fields[field_name], records)
+        self.env['res.company.rename.job']._enqueue(self)
+        self.write({'names_stale': True})
@@ -0,0 +1,118 @@
+import logging
+import threading
+
+from odoo import fields, models, api
+
+_logger = logging.getLogger(__name__)
+
+# Records recomputed and committed at once by the propagation job
+RENAME_CHUNK_SIZE = 500
+
+
+class CompanyRenameJob(models.Model):
+    _name = "res.company.rename.job"
+    _description = "Company Rename Propagation"
+    _order = "id desc"
+    _rec_name = "company_id"
+
+    company_id = fields.Many2one('res.company', 'Company', required=True,
+                                 index=True, ondelete='cascade')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, index=True)
+    stage = fields.Integer('Stage', help="Index of the target being recomputed.")
+    offset = fields.Integer('Offset', help="Records of the current target already recomputed.")
+    total_count = fields.Integer('Total Records')
+    done_count = fields.Integer('Updated Records')
+    progress = fields.Float('Progress', compute='_compute_progress')
+    error = fields.Text('Error', readonly=True)
+    date_done = fields.Datetime('Done On', readonly=True)
+
+    @api.depends('total_count', 'done_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.done_count / job.total_count if job.total_count else 0.0
+
+    @api.model
+    def _enqueue(self, companies):
+        """ Queue a propagation job per company.
+
+        Pending and failed jobs of the companies are superseded by the new
+        ones. A running job is left to finish: the cron processes the jobs in
+        order, so the new job runs again over its records after it.
+        """
+        self.search([('company_id', 'in', companies.ids),
+                     ('state', 'in', ('pending', 'failed'))]).unlink()
+        jobs = self.create([{'company_id': company.id} for company in companies])
+        cron = self.env.ref('military_company.ir_cron_company_rename_job', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return jobs
+
+    def _get_target_records(self, model_name, order=None, offset=0, limit=None):
+        return self.env[model_name].with_context(active_test=False).search(
+            [('company_id', '=', self.company_id.id)], order=order or 'id', offset=offset, limit=limit)
+
+    def _drop_pending(self, targets):
+        # Flushing a chunk marks the names depending on it (the jobs and
+        # employees of its departments) to recompute. Drop every pending
+        # recomputation of the target fields, in all records: the job
+        # recomputes each target itself, chunk by chunk.
+        for model_name, field_names, _order in targets:
+            for field_name in field_names:
+                field = self.env[model_name]._fields[field_name]
+                self.env.remove_to_compute(field, self.env.records_to_compute(field))
+
+    def _commit(self):
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+
+    def _run(self, chunk_size=RENAME_CHUNK_SIZE):
+        self.ensure_one()
+        targets = self.company_id._get_rename_targets()
+        if self.state == 'pending':
+            self.write({
+                'state': 'running',
+                'total_count': sum(len(self._get_target_records(model_name))
+                                   for model_name, _field_names, _order in targets),
+            })
+            self._commit()
+        while self.stage < len(targets):
+            model_name, field_names, order = targets[self.stage]
+            records = self._get_target_records(model_name, order, self.offset, chunk_size)
+            for field_name in field_names:
+                self.env.add_to_compute(records._fields[field_name], records)
+            records.flush_recordset(field_names)
+            self._drop_pending(targets)
+            if len(records) < chunk_size:
+                self.write({'stage': self.stage + 1, 'offset': 0,
+                            'done_count': self.done_count + len(records)})
+            else:
+                self.write({'offset': self.offset + len(records),
+                            'done_count': self.done_count + len(records)})
+            self._commit()
+        self.write({'state': 'done', 'date_done': fields.Datetime.now()})
+        if not self.search([('company_id', '=', self.company_id.id),
+                            ('state', '!=', 'done'), ('id', '!=', self.id)], limit=1):
+            self.company_id.names_stale = False
+        self._commit()
+        _logger.info("names of company %s updated: %s records", self.company_id.name, self.done_count)
+
+    def action_retry(self):
+        self.filtered(lambda job: job.state == 'failed').write({'state': 'running', 'error': False})
+        self.env.ref('military_company.ir_cron_company_rename_job')._trigger()
+
+    @api.model
+    def _cron_process_jobs(self):
+        for job in self.search([('state', 'in', ('pending', 'running'))], order='id'):
+            try:
+                job._run()
+            except Exception as error:
+                self.env.cr.rollback()
+                _logger.exception("propagation of the new name of company %s failed",
+                                  job.company_id.name)
+                job.write({'state': 'failed', 'error': str(error)})
+                self._commit()
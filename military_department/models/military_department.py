@@ -1,5 +1,8 @@
-from odoo import fields, models, api
-from odoo.osv import expression
+import logging
+
+from odoo import fields, models, api, tools
+
+_logger = logging.getLogger(__name__)
 
 
 class DepartmentTag(models.Model):
@@ -17,11 +20,14 @@ class DepartmentTag(models.Model):
 
 
 class Department(models.Model):
-    _inherit = "hr.department"
+    _name = "hr.department"
+    _inherit = ["hr.department", "military.department.tree.mixin"]
     _order = "level, sequence, name"
     _avoid_quick_create = True
 
     sequence = fields.Integer(default=1)
+    name = fields.Char(index='trigram')
+    complete_name = fields.Char(index='trigram')
     tag_ids = fields.Many2many(
         comodel_name="hr.department.tag",
         relation='hr_department_tag_rel',
@@ -82,13 +88,9 @@ class Department(models.Model):
 
     @api.model
     def _compute_member_ids(self):
+        members = self._get_subtree_records('hr.employee')
         for department in self:
-            employees = self.env['hr.employee'].search([
-                '|',
-                ('department_id', '=', department.id),
-                ('department_id', 'child_of', department.id),
-            ])
-            department.member_ids = employees
+            department.member_ids = members.get(department._origin.id, self.env['hr.employee'])
 
     @api.model
     def _compute_child_ids(self):
@@ -102,13 +104,9 @@ class Department(models.Model):
 
     @api.model
     def _compute_jobs_ids(self):
+        jobs = self._get_subtree_records('hr.job')
         for department in self:
-            jobs = self.env['hr.job'].search([
-                '|',
-                ('department_id', '=', department.id),
-                ('department_id', 'child_of', department.id),
-            ])
-            department.jobs_ids = jobs
+            department.jobs_ids = jobs.get(department._origin.id, self.env['hr.job'])
 
     @api.depends("level", "parent_id.level")
     def _compute_level(self):
@@ -119,27 +117,6 @@ class Department(models.Model):
             else:
                 dep.level = 1
 
-    def name_get(self):
-        res = []
-        for dep in self:
-            if dep.code:
-                name = "[%s] %s" % (dep.code, dep.complete_name.upper())
-            else:
-                name = dep.complete_name.upper()
-            res.append((dep.id, name))
-        return res
-
-    @api.model
-    def name_search(self, name, args=None, operator="ilike", limit=100):
-        args = args or []
-        domain = []
-        if name:
-            domain = ["|", ("code", "=ilike", name + "%"), ("name", operator, name)]
-            if operator in expression.NEGATIVE_TERM_OPERATORS:
-                domain = ["&", "!"] + domain[1:]
-        departments = self.search(domain + args, limit=limit)
-        return departments.name_get()
-
     @api.depends("parent_id", "code")
     def _department_code(self):
         for dep in self:
@@ -153,30 +130,18 @@ class Department(models.Model):
                  "company_id.name_gent")
     def _compute_complete_name(self):
         for dep in self:
-            if dep.parent_id and dep.parent_id.complete_name_gent:
-                dep.complete_name = "%s %s" % (dep.name,
-                                               dep.parent_id.complete_name_gent)
-            else:
-                dep.complete_name = "%s %s" % (dep.name, dep.company_id.name_gent)
+            dep.complete_name = self._format_complete_names(
+                dep.name, dep.name_gent, bool(dep.parent_id),
+                dep.parent_id.complete_name_gent, dep.company_id.name_gent)[0]
 
     @api.depends("name_gent",
                  "parent_id.complete_name_gent",
                  "company_id.name_gent")
     def _compute_complete_name_gent(self):
         for dep in self:
-            if not dep.name_gent:
-                if not dep.parent_id:
-                    dep.complete_name_gent = dep.name_gent
-                else:
-                    dep.complete_name_gent = dep.parent_id.complete_name_gent
-            else:
-                if dep.parent_id and dep.parent_id.complete_name_gent:
-                    dep.complete_name_gent = "%s %s" % (
-                        dep.name_gent,
-                        dep.parent_id.complete_name_gent)
-                else:
-                    dep.complete_name_gent = "%s %s" % (dep.name_gent,
-                                                        dep.company_id.name_gent)
+            dep.complete_name_gent = self._format_complete_names(
+                dep.name, dep.name_gent, bool(dep.parent_id),
+                dep.parent_id.complete_name_gent, dep.company_id.name_gent)[1]
 
     @api.onchange("name", "name_gent", "parent_id")
     def _onchange_department_name(self):
@@ -187,57 +152,187 @@ class Department(models.Model):
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
 
+    # Totals of the department and all its active descendants, kept up to date
+    # by _refresh_totals() when employees, jobs or the hierarchy change
     total_employee = fields.Integer(
         'Total Employee',
         compute='_compute_total_employee',
-        # store=True,
-        recursive=True
+        store=True
     )
     total_staff = fields.Integer(
         'Total Staff',
         compute='_compute_total_employee',
-        # store=True,
-        recursive=True
+        store=True
     )
     total_vacant = fields.Integer(
         'Total Vacant',
         compute='_compute_total_employee',
-        # store=True,
-        recursive=True
+        store=True
     )
 
-    @api.model
+    _TOTALS_QUERY = """
+        SELECT department.id,
+               COALESCE(employees.total_employee, 0),
+               COALESCE(jobs.total_staff, 0),
+               COALESCE(jobs.total_vacant, 0)
+          FROM hr_department department
+          LEFT JOIN LATERAL (
+                SELECT count(*) AS total_employee
+                  FROM hr_employee employee
+                  JOIN hr_department child ON child.id = employee.department_id
+                 WHERE employee.active
+                   AND child.active
+                   AND child.parent_path LIKE department.parent_path || '%%'
+               ) employees ON TRUE
+          LEFT JOIN LATERAL (
+                SELECT sum(job.no_of_recruitment) AS total_staff,
+                       sum(job.expected_employees) AS total_vacant
+                  FROM hr_job job
+                  JOIN hr_department child ON child.id = job.department_id
+                 WHERE job.active
+                   AND child.active
+                   AND child.parent_path LIKE department.parent_path || '%%'
+               ) jobs ON TRUE
+    """
+
+    def init(self):
+        # Prefix index for the code lookups of name_search
+        tools.create_index(self.env.cr, '%s_lower_code_index' % self._table, self._table,
+                           ['lower(code) text_pattern_ops'])
+        # Fill the stored totals of existing departments on install and update
+        self._refresh_totals()
+
+    def _flush_totals_dependencies(self):
+        self.env['hr.employee'].flush_model(['department_id', 'job_id', 'active'])
+        self.env['hr.job'].flush_model(['department_id', 'no_of_recruitment',
+                                        'expected_employees', 'active'])
+
     def _compute_total_employee(self):
+        department_ids = [department.id for department in self if department.id]
+        totals = {}
+        if department_ids:
+            self._flush_totals_dependencies()
+            self.env.cr.execute(self._TOTALS_QUERY + " WHERE department.id IN %s",
+                                [tuple(department_ids)])
+            totals = {row[0]: row[1:] for row in self.env.cr.fetchall()}
         for department in self:
-            total_employee = len(department.member_ids)
-            total_staff = 0
-            total_vacant = 0
+            department.total_employee, department.total_staff, department.total_vacant = \
+                totals.get(department.id, (0, 0, 0))
+
+    @api.model
+    def _refresh_totals(self, department_ids=None):
+        """ Recompute the stored totals of ``department_ids`` and of their
+        ancestors only (of all departments if None), in one statement.
+        """
+        if department_ids is not None:
+            department_ids = [department_id for department_id in department_ids if department_id]
+            if not department_ids:
+                return
+        self._flush_totals_dependencies()
+        self.flush_model(['parent_id', 'parent_path', 'active'])
+        if department_ids is None:
+            where, params = "", []
+        else:
+            # every id on the parent_path of the departments
+            where = """
+             WHERE department.id IN (
+                   SELECT DISTINCT unnest(string_to_array(rtrim(parent_path, '/'), '/'))::int
+                     FROM hr_department WHERE id IN %s)
+            """
+            params = [tuple(department_ids)]
+        self.env.cr.execute("""
+            UPDATE hr_department
+               SET total_employee = totals.total_employee,
+                   total_staff = totals.total_staff,
+                   total_vacant = totals.total_vacant
+              FROM ({query} {where}) AS totals (id, total_employee, total_staff, total_vacant)
+             WHERE hr_department.id = totals.id
+               AND (hr_department.total_employee, hr_department.total_staff, hr_department.total_vacant)
+                   IS DISTINCT FROM (totals.total_employee, totals.total_staff, totals.total_vacant)
+        """.format(query=self._TOTALS_QUERY, where=where), params)
+        self.invalidate_model(['total_employee', 'total_staff', 'total_vacant'])
+
+    def write(self, vals):
+        old_parents = self.parent_id.ids if {'parent_id', 'active'} & set(vals) else None
+        res = super().write(vals)
+        if old_parents is not None:
+            self._refresh_totals(old_parents + self.ids)
+        return res
+
+    def unlink(self):
+        parents = self.parent_id.ids
+        res = super().unlink()
+        self._refresh_totals(parents)
+        return res
+
+
+class Job(models.Model):
+    _inherit = "hr.job"
+
+    def _get_total_departments(self):
+        return self.department_id.ids
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        jobs = super().create(vals_list)
+        self.env['hr.department']._refresh_totals(jobs._get_total_departments())
+        return jobs
 
-            # Calculate staff and vacant positions from jobs
-            for job in department.jobs_ids:
-                total_staff += job.no_of_recruitment
-                total_vacant += job.expected_employees
+    def write(self, vals):
+        if not {'department_id', 'no_of_recruitment', 'active'} & set(vals):
+            return super().write(vals)
+        departments = self._get_total_departments()
+        res = super().write(vals)
+        self.env['hr.department']._refresh_totals(departments + self._get_total_departments())
+        return res
+
+    def unlink(self):
+        departments = self._get_total_departments()
+        res = super().unlink()
+        self.env['hr.department']._refresh_totals(departments)
+        return res
 
-            # Calculate totals for child departments
-            for sub_department in department.child_ids:
-                # total_employee += sub_department.total_employee
-                total_staff += sub_department.total_staff
-                total_vacant += sub_department.total_vacant
 
-            # Update the fields with the calculated values
-            department.total_employee += total_employee
-            department.total_staff += total_staff
-            department.total_vacant += total_vacant
+class Company(models.Model):
+    _inherit = "res.company"
+
+    @api.model
+    def _get_rename_targets(self):
+        return super()._get_rename_targets() + [
+            ('hr.department', ['complete_name', 'complete_name_gent'], 'level, id'),
+        ]
 
 
 class HrEmployee(models.Model):
     _inherit = "hr.employee"
 
     department_level = fields.Integer('Level', store='True', related='department_id.level')
+
+    def _get_total_departments(self):
+        # the vacancies of the job department change with the employee as well
+        return (self.department_id | self.job_id.department_id).ids
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        self.env['hr.department']._refresh_totals(employees._get_total_departments())
+        return employees
+
+    def write(self, vals):
+        if not {'department_id', 'job_id', 'active'} & set(vals):
+            return super().write(vals)
+        departments = self._get_total_departments()
+        res = super().write(vals)
+        self.env['hr.department']._refresh_totals(departments + self._get_total_departments())
+        return res
+
+    def unlink(self):
+        departments = self._get_total_departments()
+        res = super().unlink()
+        self.env['hr.department']._refresh_totals(departments)
+        return res
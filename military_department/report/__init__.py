@@ -0,0 +1 @@
+from . import staff_report
@@ -0,0 +1,21 @@
+from odoo import api, models
+
+
+class StaffReport(models.AbstractModel):
+    _name = 'report.hr.department_staff'
+    _description = "Staff Report"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        """ The template walks the sub-departments with ``children(department)``,
+        read from the department tree snapshot instead of a query per level.
+        """
+        docs = self.env['hr.department'].browse(docids)
+        children = docs._get_tree_children()
+        return {
+            'doc_ids': docids,
+            'doc_model': 'hr.department',
+            'docs': docs,
+            'data': data,
+            'children': lambda department: children.get(department.id, docs.browse()),
+        }
@@ -0,0 +1,4 @@
+from . import test_complete_names
+from . import test_declension_queue
+from . import test_department_tree
+from . import test_department_totals
@@ -0,0 +1,42 @@
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.military_company.models.department_tree import (
+    COMPLETE_NAME_STATEMENTS_PER_LEVEL,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestCompleteNames(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # names are checked right after the writes
+        cls.env = cls.env(context=dict(cls.env.context, declension_deferred=False,
+                                       company_rename_sync=True))
+
+    def test_rebuild_statements_per_level(self):
+        """ Rebuilding a tree several levels deep runs a bounded number of
+        statements per level, whatever the number of departments.
+        """
+        Department = self.env['hr.department']
+        root = Department.create({'name': 'Бригада', 'company_id': self.env.company.id})
+        parents = root
+        for level in range(4):
+            parents = Department.create([
+                {'name': 'Підрозділ %s-%s' % (level, index), 'parent_id': parent.id}
+                for parent in parents for index in range(2)
+            ])
+        leaves = parents
+        self.env.flush_all()
+
+        # change the root behind the ORM back, the rebuild reads the table
+        self.env.cr.execute("UPDATE hr_department SET name_gent = %s WHERE id = %s",
+                            ['Нової бригади', root.id])
+        root.invalidate_recordset(['name_gent'])
+        statements = root._rebuild_complete_names()
+
+        self.assertLessEqual(statements, COMPLETE_NAME_STATEMENTS_PER_LEVEL)
+        self.assertEqual(len(leaves), 16)
+        for leaf in leaves:
+            self.assertIn('Нової бригади', leaf.complete_name_gent)
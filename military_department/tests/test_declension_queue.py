@@ -0,0 +1,26 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDeclensionQueue(TransactionCase):
+
+    def test_deferred_department_complete_name(self):
+        """ A department inflected by the queue cron gets its genitive name and
+        the complete names built on it, not the nominative stand-in.
+        """
+        company = self.env.company
+        department = self.env['hr.department'].with_context(declension_deferred=True).create({
+            'name': 'Пральня',
+            'company_id': company.id,
+        })
+        department.flush_recordset()
+        self.assertEqual(department.name_gent, 'Пральня')
+        self.assertTrue(self.env['declension.ua.queue'].search([
+            ('res_model', '=', 'hr.department'), ('res_id', '=', department.id)]))
+
+        self.env['declension.ua.queue']._cron_process_queue()
+
+        self.assertEqual(department.name_gent, 'Пральні')
+        self.assertEqual(department.complete_name_gent, 'Пральні %s' % company.name_gent)
+        self.assertFalse(self.env['declension.ua.queue'].search([
+            ('res_model', '=', 'hr.department'), ('res_id', '=', department.id)]))
@@ -0,0 +1,57 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDepartmentTotals(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, declension_deferred=False))
+        Department = cls.env['hr.department']
+        cls.brigade = Department.create({'name': 'Бригада', 'company_id': cls.env.company.id})
+        cls.battalion = Department.create({'name': 'Батальйон', 'parent_id': cls.brigade.id})
+        cls.company_1 = Department.create({'name': 'Рота 1', 'parent_id': cls.battalion.id})
+        cls.company_2 = Department.create({'name': 'Рота 2', 'parent_id': cls.battalion.id})
+
+    def assertTotals(self, expected):
+        for department, total in expected.items():
+            self.assertEqual(department.total_employee, total, department.name)
+
+    def test_employee_totals(self):
+        """ The totals of a department and of its ancestors follow the
+        creation, move, archiving and deletion of an employee.
+        """
+        employee = self.env['hr.employee'].create({
+            'name': 'Петренко Петро',
+            'department_id': self.company_1.id,
+        })
+        self.assertTotals({self.brigade: 1, self.battalion: 1, self.company_1: 1, self.company_2: 0})
+
+        employee.department_id = self.company_2
+        self.assertTotals({self.brigade: 1, self.battalion: 1, self.company_1: 0, self.company_2: 1})
+
+        employee.active = False
+        self.assertTotals({self.brigade: 0, self.battalion: 0, self.company_1: 0, self.company_2: 0})
+
+        employee.active = True
+        self.assertTotals({self.brigade: 1, self.battalion: 1, self.company_2: 1})
+
+        employee.unlink()
+        self.assertTotals({self.brigade: 0, self.battalion: 0, self.company_1: 0, self.company_2: 0})
+
+    def test_archived_department_totals(self):
+        """ The employees of an archived department are not counted in the
+        totals of its ancestors.
+        """
+        self.env['hr.employee'].create([
+            {'name': 'Петренко Петро', 'department_id': self.company_1.id},
+            {'name': 'Іваненко Іван', 'department_id': self.company_2.id},
+        ])
+        self.assertTotals({self.brigade: 2, self.battalion: 2})
+
+        self.company_2.active = False
+        self.assertTotals({self.brigade: 1, self.battalion: 1, self.company_1: 1})
+
+        self.company_2.active = True
+        self.assertTotals({self.brigade: 2, self.battalion: 2, self.company_2: 1})
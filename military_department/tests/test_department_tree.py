@@ -0,0 +1,27 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDepartmentTree(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # names are checked right after the writes
+        cls.env = cls.env(context=dict(cls.env.context, declension_deferred=False,
+                                       company_rename_sync=True))
+
+    def test_snapshot_follows_the_transaction(self):
+        """ A department changed in the transaction is named from its fields,
+        not from a snapshot taken before the change.
+        """
+        Department = self.env['hr.department']
+        root = Department.create({'name': 'Бригада', 'company_id': self.env.company.id})
+        child = Department.create({'name': 'Рота', 'parent_id': root.id})
+        self.env.flush_all()
+        self.assertIn(child.id, Department.get_department_tree())
+
+        child.code = 'A1'
+        self.assertTrue(child.display_name.startswith('[A1] '))
+        self.assertEqual(Department.get_department_tree()[child.id].code, 'A1')
+        self.assertEqual(root._get_tree_children()[root.id], child)
@@ -22,6 +22,9 @@
         "demo/hr.employee.csv"
     ],
     "data": [
+        "security/ir.model.access.csv",
+        "security/orbat_snapshot_security.xml",
+        "data/ir_cron_data.xml",
         "views/employee_views.xml",
         "views/employee_pivot.xml",
         "report/form5.xml",
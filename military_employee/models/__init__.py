@@ -1 +1,2 @@
 from . import military_employee
+from . import orbat_snapshot
@@ -5,6 +5,7 @@ from dateutil.relativedelta import relativedelta
 
 _logger = logging.getLogger(__name__)
 
+NAME_FIELDS = {'name', 'last_name', 'first_name', 'middle_name'}
 UPDATE_PARTNER_FIELDS = ["name", "address_home_id"]
 
 
@@ -188,11 +189,10 @@ class HrEmployee(models.Model):
 
     @api.depends('name', 'first_name', 'middle_name', 'last_name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
+            for field, value in declensions[record.id].items():
                 setattr(record, field, value.title())
 
     @api.model
@@ -234,8 +234,27 @@ class HrEmployee(models.Model):
         return res
 
     def write(self, vals):
-        self._prepare_vals(vals)
-        res = super().write(vals)
-        if set(vals).intersection(UPDATE_PARTNER_FIELDS):
+        if not NAME_FIELDS.intersection(vals):
+            # Job, rank and the like: the complete name and the manager are
+            # recomputed for all the records at once
+            res = super().write(vals)
+        else:
+            # The name is made of the parts of every record
+            res = True
+            for record in self:
+                record_vals = dict(vals)
+                record._prepare_vals(record_vals)
+                res = super(HrEmployee, record).write(record_vals) and res
+        if set(vals).intersection(UPDATE_PARTNER_FIELDS) or NAME_FIELDS.intersection(vals):
             self._update_partner()
         return res
+
+
+class Company(models.Model):
+    _inherit = "res.company"
+
+    @api.model
+    def _get_rename_targets(self):
+        return super()._get_rename_targets() + [
+            ('hr.employee', ['job_title', 'complete_name'], 'id'),
+        ]
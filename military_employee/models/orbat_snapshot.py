@@ -0,0 +1,119 @@
+import logging
+
+from odoo import _, api, fields, models, tools
+from odoo.exceptions import AccessError
+
+_logger = logging.getLogger(__name__)
+
+
+class OrbatSnapshot(models.Model):
+    """ Daily copy of the structure and manning of the units.
+
+    Every snapshot holds one row per department, per job and per employee of
+    every company, so that the ORBAT on any past date is read from the last
+    snapshot taken on or before it.
+    """
+    _name = "hr.orbat.snapshot"
+    _description = "ORBAT Snapshot"
+    _order = "date desc, kind, level, id"
+    _log_access = False
+
+    date = fields.Date('Date', required=True, readonly=True)
+    company_id = fields.Many2one('res.company', 'Company', readonly=True, ondelete='cascade')
+    kind = fields.Selection([
+        ('department', 'Department'),
+        ('job', 'Job Position'),
+        ('employee', 'Employee'),
+    ], string='Kind', required=True, readonly=True)
+    name = fields.Char('Complete Name', readonly=True)
+    department_id = fields.Many2one('hr.department', 'Department', readonly=True, ondelete='set null')
+    parent_department_id = fields.Many2one('hr.department', 'Parent Department', readonly=True,
+                                           ondelete='set null')
+    level = fields.Integer('Level', readonly=True)
+    job_id = fields.Many2one('hr.job', 'Job Position', readonly=True, ondelete='set null')
+    staff = fields.Integer('Staff', readonly=True, help="Number of positions of the job.")
+    employee_id = fields.Many2one('hr.employee', 'Employee', readonly=True, ondelete='set null')
+    rank_id = fields.Many2one('military.rank', 'Rank', readonly=True, ondelete='set null')
+    location_id = fields.Many2one('hr.work.location', 'Location', readonly=True, ondelete='set null')
+
+    def init(self):
+        # get_orbat() looks up the last snapshot date, then reads its rows
+        tools.create_index(self.env.cr, 'hr_orbat_snapshot_company_date_index',
+                           self._table, ['company_id', 'date'])
+
+    @api.model
+    def _take_snapshot(self, date=None):
+        """ Copy the current ORBAT of all companies with one INSERT ... SELECT.
+
+        Taking the snapshot of a date again replaces it.
+        """
+        date = date or fields.Date.context_today(self)
+        self.env['hr.department'].flush_model()
+        self.env['hr.job'].flush_model()
+        self.env['hr.employee'].flush_model()
+        cr = self.env.cr
+        cr.execute("DELETE FROM hr_orbat_snapshot WHERE date = %s", [date])
+        cr.execute("""
+            INSERT INTO hr_orbat_snapshot
+                   (date, company_id, kind, name, department_id, parent_department_id,
+                    level, job_id, staff, employee_id, rank_id, location_id)
+            SELECT %(date)s, department.company_id, 'department', department.complete_name,
+                   department.id, department.parent_id, department.level,
+                   NULL, NULL, NULL, NULL, NULL
+              FROM hr_department department
+             WHERE department.active
+             UNION ALL
+            SELECT %(date)s, job.company_id, 'job', job.complete_name,
+                   job.department_id, NULL, job.level,
+                   job.id, job.no_of_recruitment, NULL, NULL, NULL
+              FROM hr_job job
+             WHERE job.active
+             UNION ALL
+            SELECT %(date)s, employee.company_id, 'employee', employee.complete_name,
+                   employee.department_id, NULL, NULL,
+                   employee.job_id, NULL, employee.id, employee.rank_id, employee.work_location_id
+              FROM hr_employee employee
+             WHERE employee.active
+        """, {'date': date})
+        _logger.info("ORBAT snapshot of %s: %s rows", date, cr.rowcount)
+        return cr.rowcount
+
+    @api.model
+    def _cron_take_snapshot(self):
+        self._take_snapshot()
+
+    @api.model
+    def get_orbat(self, company, date):
+        """ Return the ORBAT of ``company`` (record or id) on ``date``.
+
+        The rows come from the last snapshot taken on or before ``date``;
+        ``snapshot_date`` is False when there is none.
+
+        :return: dict with ``snapshot_date`` and the ``departments``, ``jobs``
+                 and ``employees`` rows as dicts
+        """
+        self.check_access_rights('read')
+        company_id = company.id if isinstance(company, models.BaseModel) else company
+        # The rows are read in SQL, apply the multi-company rule here
+        if not self.env.su and company_id not in self.env.user.company_ids.ids:
+            raise AccessError(_("You cannot read the ORBAT of a company you do not belong to."))
+        date = fields.Date.to_date(date)
+        result = {'snapshot_date': False, 'departments': [], 'jobs': [], 'employees': []}
+        self.env.cr.execute("""
+            SELECT max(date) FROM hr_orbat_snapshot
+             WHERE company_id = %s AND date <= %s
+        """, [company_id, date])
+        snapshot_date = self.env.cr.fetchone()[0]
+        if not snapshot_date:
+            return result
+        result['snapshot_date'] = snapshot_date
+        self.env.cr.execute("""
+            SELECT kind, name, department_id, parent_department_id, level,
+                   job_id, staff, employee_id, rank_id, location_id
+              FROM hr_orbat_snapshot
+             WHERE company_id = %s AND date = %s
+             ORDER BY kind, level, id
+        """, [company_id, snapshot_date])
+        for row in self.env.cr.dictfetchall():
+            result[row.pop('kind') + 's'].append(row)
+        return result
@@ -22,6 +22,7 @@
     "data": [
         "security/military_hr_security.xml",
         "security/ir.model.access.csv",
+        "data/ir_cron_data.xml",
         "views/military_employee.xml",
         "views/military_employee_location.xml",
         "views/military_department.xml",
@@ -29,6 +30,7 @@
         "views/military_job.xml",
         "views/military_rank_assign.xml",
         "views/military_job_assign.xml",
+        "wizard/military_order_import_views.xml",
         # "report/form5.xml",
         "views/menu.xml",
     ],
@@ -1,24 +1,29 @@
-from odoo import fields, models, api, _
-from odoo.osv import expression
+import logging
+from collections import defaultdict
+
+from odoo import fields, models, api, tools, _
 from odoo.exceptions import ValidationError
 
+_logger = logging.getLogger(__name__)
+
 
 class MilitaryDepartment(models.Model):
     _name = "military.department"
     _description = "Department"
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'military.department.tree.mixin']
     _rec_name = 'complete_name'
     _parent_store = True
     _order = "level, sequence, name"
     _avoid_quick_create = True
 
     sequence = fields.Integer(default=1)
-    name = fields.Char('Department Name', required=True)
+    name = fields.Char('Department Name', required=True, index='trigram')
     complete_name = fields.Char(
         'Complete Name',
         compute='_compute_complete_name',
         recursive=True,
-        store=True
+        store=True,
+        index='trigram'
     )
     active = fields.Boolean('Active', default=True)
     company_id = fields.Many2one('res.company', string='Company', index=True,
@@ -102,13 +107,9 @@ class MilitaryDepartment(models.Model):
 
     @api.model
     def _compute_member_ids(self):
+        members = self._get_subtree_records('military.employee')
         for department in self:
-            employees = self.env['military.employee'].search([
-                '|',
-                ('department_id', '=', department.id),
-                ('department_id', 'child_of', department.id),
-            ])
-            department.member_ids = employees
+            department.member_ids = members.get(department._origin.id, self.env['military.employee'])
 
     @api.model
     def _compute_child_ids(self):
@@ -116,13 +117,37 @@ class MilitaryDepartment(models.Model):
 
     @api.model
     def _compute_job_ids(self):
+        jobs = self._get_subtree_records('military.job')
         for department in self:
-            jobs = self.env['military.job'].search([
-                '|',
-                ('department_id', '=', department.id),
-                ('department_id', 'child_of', department.id),
-            ])
-            department.job_ids = jobs
+            department.job_ids = jobs.get(department._origin.id, self.env['military.job'])
+
+    def _update_employee_manager(self):
+        """ Mark for recomputation the manager of the employees of the subtrees
+        of ``self`` who report up the hierarchy: the department managers and
+        the members of departments without manager.
+
+        The members of the departments themselves follow the ``parent_id``
+        dependencies; one query collects the others.
+
+        :return: the marked employees
+        """
+        if not self.ids:
+            return self.env['military.employee']
+        self.flush_model(['manager_id', 'parent_path'])
+        self.env['military.employee'].flush_model(['department_id'])
+        self.env.cr.execute("""
+            SELECT employee.id
+              FROM military_employee employee
+              JOIN military_department department ON department.id = employee.department_id
+              JOIN military_department root
+                ON department.parent_path LIKE root.parent_path || '%%'
+             WHERE root.id IN %s
+               AND department.id != root.id
+               AND (department.manager_id IS NULL OR department.manager_id = employee.id)
+        """, [tuple(self.ids)])
+        employees = self.env['military.employee'].browse(row[0] for row in self.env.cr.fetchall())
+        self.env.add_to_compute(employees._fields['parent_id'], employees)
+        return employees
 
     @api.depends("level", "parent_id.level")
     def _compute_level(self):
@@ -137,26 +162,10 @@ class MilitaryDepartment(models.Model):
     def name_create(self, name):
         return self.create({'name': name}).name_get()[0]
 
-    def name_get(self):
-        res = []
-        for dep in self:
-            if dep.code:
-                name = "[%s] %s" % (dep.code, dep.complete_name.upper())
-            else:
-                name = dep.complete_name.upper()
-            res.append((dep.id, name))
-        return res
-
-    @api.model
-    def name_search(self, name, args=None, operator="ilike", limit=100):
-        args = args or []
-        domain = []
-        if name:
-            domain = ["|", ("code", "=ilike", name + "%"), ("name", operator, name)]
-            if operator in expression.NEGATIVE_TERM_OPERATORS:
-                domain = ["&", "!"] + domain[1:]
-        departments = self.search(domain + args, limit=limit)
-        return departments.name_get()
+    def init(self):
+        # Prefix index for the code lookups of name_search
+        tools.create_index(self.env.cr, '%s_lower_code_index' % self._table, self._table,
+                           ['lower(code) text_pattern_ops'])
 
     @api.depends("parent_id", "code")
     def _department_code(self):
@@ -171,30 +180,18 @@ class MilitaryDepartment(models.Model):
                  "company_id.name_gent")
     def _compute_complete_name(self):
         for dep in self:
-            if dep.parent_id and dep.parent_id.complete_name_gent:
-                dep.complete_name = "%s %s" % (dep.name,
-                                               dep.parent_id.complete_name_gent)
-            else:
-                dep.complete_name = "%s %s" % (dep.name, dep.company_id.name_gent)
+            dep.complete_name = self._format_complete_names(
+                dep.name, dep.name_gent, bool(dep.parent_id),
+                dep.parent_id.complete_name_gent, dep.company_id.name_gent)[0]
 
     @api.depends("name_gent",
                  "parent_id.complete_name_gent",
                  "company_id.name_gent")
     def _compute_complete_name_gent(self):
         for dep in self:
-            if not dep.name_gent:
-                if not dep.parent_id:
-                    dep.complete_name_gent = dep.name_gent
-                else:
-                    dep.complete_name_gent = dep.parent_id.complete_name_gent
-            else:
-                if dep.parent_id and dep.parent_id.complete_name_gent:
-                    dep.complete_name_gent = "%s %s" % (
-                        dep.name_gent,
-                        dep.parent_id.complete_name_gent)
-                else:
-                    dep.complete_name_gent = "%s %s" % (dep.name_gent,
-                                                        dep.company_id.name_gent)
+            dep.complete_name_gent = self._format_complete_names(
+                dep.name, dep.name_gent, bool(dep.parent_id),
+                dep.parent_id.complete_name_gent, dep.company_id.name_gent)[1]
 
     @api.onchange("name", "name_gent", "parent_id")
     def _onchange_department_name(self):
@@ -205,12 +202,10 @@ class MilitaryDepartment(models.Model):
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
 
     @api.constrains('parent_id')
     def _check_parent_id(self):
@@ -228,10 +223,14 @@ class MilitaryDepartment(models.Model):
         # the tracking allows to track+subscribe fields linked to a res.user record
         # An update of the limited behavior should come, but not currently done.
         departments = super(MilitaryDepartment, self.with_context(mail_create_nosubscribe=True)).create(vals_list)
+        # one subscription per manager, not per department
+        departments_by_manager = defaultdict(lambda: self.browse())
         for department, vals in zip(departments, vals_list):
-            manager = self.env['military.employee'].browse(vals.get("manager_id"))
-            if manager.user_id:
-                department.message_subscribe(partner_ids=manager.user_id.partner_id.ids)
+            if vals.get("manager_id"):
+                departments_by_manager[vals["manager_id"]] |= department
+        managers = self.env['military.employee'].browse(list(departments_by_manager))
+        for manager in managers.filtered('user_id'):
+            departments_by_manager[manager.id].message_subscribe(partner_ids=manager.user_id.partner_id.ids)
         return departments
 
     def write(self, vals):
@@ -248,12 +247,27 @@ class MilitaryDepartment(models.Model):
                 # subscribe the manager user
                 if manager.user_id:
                     self.message_subscribe(partner_ids=manager.user_id.partner_id.ids)
+        res = super(MilitaryDepartment, self).write(vals)
+        if {'manager_id', 'parent_id'} & set(vals):
             # set the employees's parent to the new manager
-            self._update_employee_manager(manager_id)
-        return super(MilitaryDepartment, self).write(vals)
+            self._update_employee_manager()
+        return res
     
     
 class MilitaryEmployee(models.Model):
     _inherit = "military.employee"
 
     department_level = fields.Integer('Level', store='True', related='department_id.level')
+
+
+class Company(models.Model):
+    _inherit = "res.company"
+
+    @api.model
+    def _get_rename_targets(self):
+        return super()._get_rename_targets() + [
+            ('military.department', ['complete_name', 'complete_name_gent'], 'level, id'),
+            ('military.job', ['complete_name', 'complete_name_gent', 'complete_name_datv',
+                              'complete_name_ablt'], 'level, id'),
+            ('military.employee', ['job_title', 'complete_name'], 'id'),
+        ]
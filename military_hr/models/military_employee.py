@@ -5,6 +5,8 @@ from dateutil.relativedelta import relativedelta
 
 _logger = logging.getLogger(__name__)
 
+NAME_FIELDS = {'name', 'last_name', 'first_name', 'middle_name'}
+
 
 class MilitaryEmployee(models.Model):
     _name = "military.employee"
@@ -106,7 +108,9 @@ class MilitaryEmployee(models.Model):
         # readonly=True
     )
     parent_id = fields.Many2one(
-        related="department_id.manager_id",
+        "military.employee",
+        "Manager",
+        compute="_compute_parent_id",
         store=True,
         readonly=True
     )
@@ -246,6 +250,20 @@ class MilitaryEmployee(models.Model):
         for rec in self:
             rec.complete_name = rec._get_complete_name(rec.rank_id, rec.name, rec.job_title)
 
+    @api.depends("department_id.manager_id", "department_id.parent_id")
+    def _compute_parent_id(self):
+        """ The manager of the department, or for its manager and the members of
+        a department without manager, the first manager up the hierarchy.
+
+        The managers of the upper departments are not dependencies, changing
+        them marks the members of the subtree (see ``_update_employee_manager``).
+        """
+        for rec in self:
+            department = rec.department_id
+            while department and (not department.manager_id or department.manager_id == rec):
+                department = department.parent_id
+            rec.parent_id = department.manager_id
+
     @api.depends("birthday")
     def _compute_age(self):
         for rec in self:
@@ -253,11 +271,10 @@ class MilitaryEmployee(models.Model):
 
     @api.depends('name', 'first_name', 'middle_name', 'last_name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
+            for field, value in declensions[record.id].items():
                 setattr(record, field, value.title())
 
     @api.model
@@ -287,8 +304,6 @@ class MilitaryEmployee(models.Model):
             name = vals.get("name", self.name)
             job_title = vals.get("job_title", self.job_title)
             vals["complete_name"] = self._get_complete_name(self.rank_id, name, job_title)
-        if not vals.get("parent_id"):
-            vals["parent_id"] = self.department_id.manager_id
         return res
 
     @api.model_create_multi
@@ -299,6 +314,15 @@ class MilitaryEmployee(models.Model):
         return res
 
     def write(self, vals):
-        self._prepare_vals(vals)
-        res = super().write(vals)
+        if not NAME_FIELDS.intersection(vals):
+            # Job, rank and the like: the complete name and the manager are
+            # recomputed for all the records at once
+            res = super().write(vals)
+        else:
+            # The name is made of the parts of every record
+            res = True
+            for record in self:
+                record_vals = dict(vals)
+                record._prepare_vals(record_vals)
+                res = super(MilitaryEmployee, record).write(record_vals) and res
         return res
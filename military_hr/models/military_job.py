@@ -46,12 +46,10 @@ class MilitaryJob(models.Model):
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
 
     complete_name = fields.Char(
         string='Job Name',
@@ -79,6 +77,31 @@ class MilitaryJob(models.Model):
     )
     mos = fields.Char(string="Job MOS code")
     payroll_grade = fields.Char(string="Payroll Grade")
+    no_of_recruitment = fields.Integer(
+        string='Target',
+        default=1,
+        help='Number of positions of the job.'
+    )
+    employee_ids = fields.One2many(
+        'military.employee',
+        'job_id',
+        string='Employees',
+        groups='base.group_user'
+    )
+    no_of_employee = fields.Integer(
+        string="Current Number of Employees",
+        compute='_compute_employees',
+        store=True,
+        help='Number of employees currently occupying this job position.'
+    )
+    # Stored and indexed: the destination job pickers filter on vacancies
+    expected_employees = fields.Integer(
+        string='Vacancies',
+        compute='_compute_employees',
+        store=True,
+        index=True,
+        help='Number of positions of the job not occupied yet.'
+    )
     employee_id = fields.Many2one(
         'military.employee',
         string='Employees',
@@ -125,6 +148,15 @@ class MilitaryJob(models.Model):
                 job.complete_name_ablt = '%s %s' % (
                     job.name_ablt, job.department_id.complete_name_gent)
 
+    @api.depends('no_of_recruitment', 'employee_ids.job_id', 'employee_ids.active', 'active')
+    def _compute_employees(self):
+        employee_data = self.env['military.employee']._read_group([('job_id', 'in', self.ids)],
+                                                                  ['job_id'], ['job_id'])
+        result = dict((data['job_id'][0], data['job_id_count']) for data in employee_data)
+        for job in self:
+            job.no_of_employee = result.get(job.id, 0)
+            job.expected_employees = job.no_of_recruitment - result.get(job.id, 0)
+
     @api.onchange('name', 'department_id')
     def _onchange_name(self):
         if self.name or self.department_id:
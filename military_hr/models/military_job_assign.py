@@ -1,6 +1,14 @@
+import logging
+from collections import Counter, defaultdict
+
 from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError, AccessError, UserError
 
+_logger = logging.getLogger(__name__)
+
+# Order states in which a line still has to be applied
+OPEN_STATES = ('draft', 'confirm')
+
 
 # ToDo:
 # Add job verification procedures:
@@ -10,10 +18,12 @@ from odoo.exceptions import ValidationError, AccessError, UserError
 
 class MilitaryJobAssign(models.Model):
     _name = "military.job.assign"
-    _inherit = ["mail.thread"]
+    _inherit = ["mail.thread", "military.order.scheduler.mixin"]
     _description = "Employee Job Assignment"
     _rec_name = "complete_name"
     _check_company_auto = True
+    _order_scheduler_cron = "military_hr.ir_cron_military_job_assign_scheduler"
+    _order_line_field = "assign_line"
     _order = "date desc"
 
     name = fields.Char(
@@ -48,7 +58,7 @@ class MilitaryJobAssign(models.Model):
         index=True,
         states={'draft': [('readonly', False)]},
         copy=False,
-        default=fields.Date.today,
+        default=lambda self: self._get_today(),
         help="Date of assign"
     )
     partner_id = fields.Many2one(
@@ -99,7 +109,7 @@ class MilitaryJobAssign(models.Model):
 
     def effective_date_in_past(self):
         for assign in self:
-            if assign.date > fields.Date.today():
+            if assign.date > self._get_today():
                 raise UserError(
                     _(
                         "Assignment date should be before today!"
@@ -124,10 +134,10 @@ class MilitaryJobAssign(models.Model):
     def action_done(self):
         self.ensure_one()
         has_permission = self._check_permission_group("military_job.group_military_job_assign")
-        if has_permission and self.effective_date_in_past():
+        if has_permission and self._is_due():
             self.state_done()
         else:
-            self.write({"state": "done"})
+            self._schedule()
 
     def action_confirm(self):
         self.ensure_one()
@@ -167,19 +177,38 @@ class MilitaryJobAssign(models.Model):
             assign.state = "confirm"
         return True
 
+    def _apply_lines(self):
+        """ Move the employees of the lines to their destination jobs.
+
+        The lines are grouped by destination job, one write per job, and the
+        recomputes and tracking they trigger are flushed once for the orders.
+        """
+        cr = self.env.cr
+        count = cr.sql_log_count
+        lines = self.assign_line
+        # The last line of an employee wins, as when the lines were applied one by one
+        jobs = {line.employee_id: line.dst_job_id for line in lines}
+        employees_by_job = defaultdict(lambda: self.env['military.employee'])
+        for employee, job in jobs.items():
+            employees_by_job[job] |= employee
+        for job, employees in employees_by_job.items():
+            employees.write({'job_id': job.id})
+        self.env.flush_all()
+        if lines:
+            _logger.info("%s lines of %s applied in %s statements (%.1f per line)",
+                         len(lines), self._description, cr.sql_log_count - count,
+                         (cr.sql_log_count - count) / len(lines))
+
     def state_done(self):
-        today = fields.Date.today()
-        for assign in self:
-            if assign.date <= today:
-                for assign_line in assign.assign_line:
-                    assign_line.employee_id.job_id = assign_line.dst_job_id
-                assign.state = "done"
-            else:
-                raise UserError(
-                    _(
-                        "Assignment date should be before today!"
-                    )
+        today = self._get_today()
+        if any(order.date > today for order in self):
+            raise UserError(
+                _(
+                    "Assignment date should be before today!"
                 )
+            )
+        self._apply_lines()
+        self.write({"state": "done"})
         return True
 
     def signal_confirm(self):
@@ -227,6 +256,7 @@ class MilitaryJobAssignLine(models.Model):
         string="Employee",
         comodel_name="military.employee",
         required=True,
+        index=True,
         readonly=True,
         states={"draft": [("readonly", False)]},
         check_company=True,
@@ -282,6 +312,14 @@ class MilitaryJobAssignLine(models.Model):
         help="Basis of the assign"
     )
 
+    # One open line per employee; the constraint index also serves the
+    # lookups of the open lines of an employee
+    _sql_constraints = [
+        ("employee_open_line_unique",
+         "EXCLUDE (employee_id WITH =) WHERE (state IN ('draft', 'confirm'))",
+         "An employee can only be assigned once in open orders!"),
+    ]
+
     @api.onchange("dst_job_id")
     def _onchange_dst_job(self):
         if self.dst_job_id:
@@ -299,36 +337,44 @@ class MilitaryJobAssignLine(models.Model):
                 assign.src_job_id = False
                 assign.src_department_id = False
 
-    # @api.model
-    # def create(self, values):
-    #     # Check if expected_employees is >= 0
-    #     if 'dst_job_id' in values and values.get('dst_job_id'):
-    #         destination_job = self.env['military.job'].browse(values['dst_job_id'])
-    #         new_expected_employees = values.get('new_expected_employees',
-    #                                             destination_job.expected_employees)
-    #         if new_expected_employees < 0:
-    #             raise ValidationError(
-    #                 "Expected Employees for the destination job must be greater than or equal to 0.")
-    #
-    #     # Check if employee_id is used only once in assign
-    #     employee_id = values.get('employee_id')
-    #     if employee_id:
-    #         existing_assign_lines = self.search([('employee_id', '=', employee_id)])
-    #         if existing_assign_lines:
-    #             raise ValidationError("An employee can only be assignred once.")
-    #
-    #     return super(HrTransferLine, self).create(values)
-    #
-    def write(self, values):
-
-        # Check if employee_id is used only once in assign
-        employee_id = values.get('employee_id', self.employee_id.id)
-        existing_assign_lines = self.search(
-            [('employee_id', '=', employee_id), ('id', '!=', self.id)])
-        if existing_assign_lines:
-            raise ValidationError("An employee can only be assignred once.")
-
-        return super(MilitaryJobAssignLine, self).write(values)
+    def _check_open_line_employees(self, employee_ids):
+        """ Raise once, listing them all, if any of ``employee_ids`` is given
+        twice or is already on an open line other than ``self``.
+
+        The exclusion constraint stays the backstop, e.g. for reopened orders.
+        """
+        counts = Counter(employee_ids)
+        if not counts:
+            return
+        conflicts = {employee_id for employee_id, count in counts.items() if count > 1}
+        other_lines = self.search([
+            ('employee_id', 'in', list(counts)),
+            ('state', 'in', OPEN_STATES),
+            ('id', 'not in', self.ids),
+        ])
+        conflicts.update(other_lines.employee_id.ids)
+        if conflicts:
+            employees = self.env['military.employee'].browse(sorted(conflicts))
+            raise ValidationError(_(
+                "An employee can only be assigned once in open orders:\n%s",
+                "\n".join(employees.mapped('complete_name'))))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = self.env['military.job.assign'].browse(
+            {vals['assign_id'] for vals in vals_list if vals.get('assign_id')})
+        open_order_ids = set(orders.filtered(lambda order: order.state in OPEN_STATES).ids)
+        self.browse()._check_open_line_employees([
+            vals['employee_id'] for vals in vals_list
+            if vals.get('employee_id') and vals.get('assign_id') in open_order_ids
+        ])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('employee_id'):
+            lines = self.filtered(lambda line: line.state in OPEN_STATES)
+            lines._check_open_line_employees([vals['employee_id']] * len(lines))
+        return super().write(vals)
 
 
 class MilitaryEmployee(models.Model):
@@ -349,11 +395,6 @@ class MilitaryEmployee(models.Model):
 
     @api.depends('job_id')
     def _compute_assign_id(self):
+        orders = self.env['military.job.assign']._get_last_done_orders(self)
         for employee in self:
-            domain = [
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'done'),
-            ]
-            job_assign_id = self.env['military.job.assign.line'].search(domain, limit=1,
-                                                                        order='date desc')
-            employee.job_assign_id = job_assign_id.assign_id
+            employee.job_assign_id = orders.get(employee._origin.id, False)
@@ -39,12 +39,10 @@ class MilitaryRank(models.Model):
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
 
     category = fields.Selection([
         ("private", "private"),
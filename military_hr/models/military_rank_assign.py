@@ -1,13 +1,17 @@
+from collections import defaultdict
+
 from odoo import _, api, fields, models
 from odoo.exceptions import AccessError, UserError
 
 
 class RankAssign(models.Model):
     _name = "rank.assign"
-    _inherit = "mail.thread"
+    _inherit = ["mail.thread", "military.order.scheduler.mixin"]
     _description = "Rank Assign"
     _rec_name = "complete_name"
     _check_company_auto = True
+    _order_scheduler_cron = "military_hr.ir_cron_rank_assign_scheduler"
+    _order_line_field = "assign_line"
 
     number = fields.Char(
         "Order Number",
@@ -40,7 +44,7 @@ class RankAssign(models.Model):
         index=True,
         states={'draft': [('readonly', False)]},
         copy=False,
-        default=fields.Date.today,
+        default=lambda self: self._get_today(),
         help="Date of assign"
     )
     partner_id = fields.Many2one(
@@ -79,7 +83,7 @@ class RankAssign(models.Model):
     def effective_date_in_future(self):
 
         for assign in self:
-            if assign.date >= fields.Date.today():
+            if assign.date >= self._get_today():
                 return False
         return True
 
@@ -101,10 +105,10 @@ class RankAssign(models.Model):
         has_permission = self._check_permission_group(
             "military_rank.group_rank_assign"
         )
-        if has_permission and not self.effective_date_in_future():
+        if has_permission and self._is_due():
             self.state_done()
         else:
-            self.write({"state": "confirm"})
+            self._schedule()
 
     def action_confirm(self):
         self.ensure_one()
@@ -157,10 +161,16 @@ class RankAssign(models.Model):
         return True
 
     def state_done(self):
-        today = fields.Date.today()
+        today = self._get_today()
         for assign in self:
             if assign.date <= today:
-                assign.assign_line.employee_id.rank_id = assign.assign_line.dst_rank
+                # One write per rank: the lines of an order may give different ranks
+                ranks = {line.employee_id: line.dst_rank for line in assign.assign_line}
+                employees_by_rank = defaultdict(lambda: self.env['military.employee'])
+                for employee, rank in ranks.items():
+                    employees_by_rank[rank] |= employee
+                for rank, employees in employees_by_rank.items():
+                    employees.write({'rank_id': rank.id})
                 assign.state = "done"
                 # assign.assign_line.state = "done"
             else:
@@ -204,6 +214,7 @@ class RankAssignLine(models.Model):
         string="Employee",
         comodel_name="military.employee",
         required=True,
+        index=True,
         readonly=True,
         states={"draft": [("readonly", False)]},
         check_company=True,
@@ -226,10 +237,8 @@ class RankAssignLine(models.Model):
 
     @api.depends("employee_id")
     def _compute_rank(self):
-        if self.employee_id.rank_id:
-            self.src_rank = self.employee_id.rank_id
-        else:
-            self.src_rank = False
+        for line in self:
+            line.src_rank = line.employee_id.rank_id
 
     @api.onchange("employee_id")
     def _onchange_employee(self):
@@ -259,11 +268,6 @@ class MilitaryEmployee(models.Model):
 
     @api.depends('rank_id')
     def _compute_rank_assign_id(self):
+        orders = self.env['rank.assign']._get_last_done_orders(self)
         for employee in self:
-            domain = [
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'done'),
-            ]
-            rank_assign_id = self.env['rank.assign.line'].search(domain, limit=1,
-                                                                 order='date desc')
-            employee.rank_assign_id = rank_assign_id.assign_id
+            employee.rank_assign_id = orders.get(employee._origin.id, False)
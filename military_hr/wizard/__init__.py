@@ -0,0 +1 @@
+from . import military_order_import
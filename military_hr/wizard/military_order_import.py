@@ -0,0 +1,322 @@
+import base64
+import csv
+import io
+import logging
+import time
+
+from odoo import Command, _, api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Column names of the imported files, lowercase; the first name found is used
+EMPLOYEE_COLUMNS = ('identification_id', 'employee')
+JOB_COLUMNS = ('job',)
+MOS_COLUMNS = ('mos',)
+DEPARTMENT_COLUMNS = ('department',)
+RANK_COLUMNS = ('rank',)
+DESCRIPTION_COLUMNS = ('description',)
+
+# Marks a key shared by several records in a lookup map
+AMBIGUOUS = object()
+
+# Order states in which a line still has to be applied
+OPEN_STATES = ('draft', 'confirm')
+
+# Model of the order created for each order type
+ORDER_MODELS = {
+    'job_assign': 'military.job.assign',
+    'rank_assign': 'rank.assign',
+}
+
+
+def _normalize(value):
+    if value is None or value is False:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # spreadsheets turn identification numbers into floats
+        value = int(value)
+    return ' '.join(str(value).split()).lower()
+
+
+def _build_map(rows, key_fields, key=None):
+    """ Map the normalized values of ``key_fields`` of ``rows`` to the row ids.
+
+    A value shared by several rows maps to ``AMBIGUOUS``.
+    """
+    lookup = {}
+    for row in rows:
+        for field_name in key_fields:
+            value = _normalize(row[field_name])
+            if not value:
+                continue
+            if key:
+                value = key(row, value)
+            if lookup.get(value, row['id']) != row['id']:
+                lookup[value] = AMBIGUOUS
+            else:
+                lookup[value] = row['id']
+    return lookup
+
+
+class MilitaryOrderImport(models.TransientModel):
+    """ Create a job assignment or a rank assignment order from a spreadsheet.
+
+    Every row of the file gives an employee (identification number or full
+    name) and its destination: job (name, "department / job" or MOS) and
+    department (code or name) for job assignments, rank (name, short name or
+    NATO code) for rank assignments. The rows are resolved against lookup
+    maps read once, and the order is created with all its lines at once.
+    """
+    _name = "military.order.import"
+    _description = "Order Import"
+
+    order_type = fields.Selection([
+        ('job_assign', 'Job Assignment'),
+        ('rank_assign', 'Rank Assignment'),
+    ], string='Order Type', required=True, default='job_assign')
+    file = fields.Binary('File', required=True, attachment=False)
+    file_name = fields.Char('File Name')
+    number = fields.Char('Order Number', required=True)
+    date = fields.Date('Date', required=True, default=fields.Date.context_today)
+    partner_id = fields.Many2one('res.partner', string='Order Author', required=True)
+    company_id = fields.Many2one('res.company', 'Company', required=True,
+                                 default=lambda self: self.env.company)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft')
+    job_assign_id = fields.Many2one('military.job.assign', 'Job Assignment', readonly=True)
+    rank_assign_id = fields.Many2one('rank.assign', 'Rank Assignment', readonly=True)
+    line_count = fields.Integer('Imported Lines', readonly=True)
+    unmatched_count = fields.Integer('Unmatched Rows', readonly=True)
+    report = fields.Text('Unmatched Rows Report', readonly=True)
+
+    # Reading the file
+
+    def _read_rows(self):
+        """ Return the ``(row number, row)`` of the file, rows being dicts with
+        lowercase column names; row numbers are the ones of the spreadsheet.
+        """
+        content = base64.b64decode(self.file)
+        if (self.file_name or '').lower().endswith(('.xlsx', '.xlsm')):
+            table = self._read_xlsx(content)
+        else:
+            table = self._read_csv(content)
+        header = [_normalize(column) for column in next(table, [])]
+        if not header:
+            raise UserError(_("The file is empty."))
+        return [(row_number, dict(zip(header, row))) for row_number, row in enumerate(table, start=2)
+                if any(_normalize(value) for value in row)]
+
+    def _read_csv(self, content):
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = content.decode('cp1251')
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        return csv.reader(io.StringIO(text), dialect)
+
+    def _read_xlsx(self, content):
+        try:
+            import openpyxl
+        except ImportError:
+            raise UserError(_("Reading XLSX files requires the openpyxl library, "
+                              "save the file as CSV or install openpyxl."))
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        return iter([list(row) for row in workbook.active.iter_rows(values_only=True)])
+
+    # Lookup maps
+
+    def _company_domain(self):
+        return ['|', ('company_id', '=', False), ('company_id', '=', self.company_id.id)]
+
+    def _get_lookup_maps(self):
+        """ Read once the natural keys of the employees and of the records the
+        lines of the order type point to: jobs and departments, or ranks.
+        """
+        company_domain = self._company_domain()
+        employees = self.env['military.employee'].search_read(
+            company_domain, ['identification_id', 'name', 'complete_name'])
+        maps = {
+            'employee': _build_map(employees, ['identification_id', 'name', 'complete_name']),
+            'open_line': {},
+        }
+        if self.order_type == 'job_assign':
+            departments = self.env['military.department'].search_read(
+                company_domain, ['code', 'name', 'complete_name'])
+            jobs = self.env['military.job'].search_read(
+                company_domain, ['name', 'complete_name', 'mos', 'department_id'], load=None)
+            maps.update({
+                'department': _build_map(departments, ['code', 'name', 'complete_name']),
+                'job': _build_map(jobs, ['complete_name']),
+                # "department / job", the job names repeat from a unit to another
+                'department_job': _build_map(jobs, ['name'], key=lambda row, value: (
+                    row['department_id'], value)),
+                'mos': _build_map(jobs, ['mos']),
+                'job_department': {job['id']: job['department_id'] for job in jobs},
+                'open_line': self._get_open_line_orders(),
+            })
+        else:
+            ranks = self.env['military.rank'].search_read(
+                [], ['name', 'name_short', 'nato_code'])
+            maps['rank'] = _build_map(ranks, ['name', 'name_short', 'nato_code'])
+        return maps
+
+    def _get_line_model(self):
+        order_model = self.env[ORDER_MODELS[self.order_type]]
+        return self.env[order_model._fields['assign_line'].comodel_name]
+
+    def _get_open_line_orders(self):
+        """ Return ``{employee_id: order name}`` of the employees already on a
+        line of a draft or confirmed job assignment; one line more would break
+        the one open line per employee constraint.
+        """
+        lines = self._get_line_model().search_read(
+            [('state', 'in', OPEN_STATES)], ['employee_id', 'assign_id'])
+        return {line['employee_id'][0]: line['assign_id'][1]
+                for line in lines if line['employee_id'] and line['assign_id']}
+
+    @api.model
+    def _get_value(self, row, columns):
+        for column in columns:
+            if _normalize(row.get(column)):
+                return row[column]
+        return None
+
+    @api.model
+    def _resolve(self, lookup, value, label, errors):
+        key = _normalize(value)
+        if not key:
+            errors.append(_("%s is missing", label))
+            return None
+        record_id = lookup.get(key)
+        if record_id is AMBIGUOUS:
+            errors.append(_("%s \"%s\" matches several records", label, value))
+            return None
+        if not record_id:
+            errors.append(_("%s \"%s\" not found", label, value))
+        return record_id
+
+    # Lines
+
+    def _prepare_job_assign_line(self, row, maps, errors):
+        values = {}
+        department = self._get_value(row, DEPARTMENT_COLUMNS)
+        job = self._get_value(row, JOB_COLUMNS)
+        mos = self._get_value(row, MOS_COLUMNS)
+        if not (department or job or mos):
+            errors.append(_("Job or department is missing"))
+            return values
+        department_id = None
+        if department:
+            department_id = self._resolve(maps['department'], department, _("Department"), errors)
+        job_id = None
+        if job and department_id:
+            job_id = maps['department_job'].get((department_id, _normalize(job)))
+            if job_id is AMBIGUOUS:
+                job_id = None
+        if job and not job_id:
+            job_id = self._resolve(maps['job'], job, _("Job"), errors)
+        elif not job and mos:
+            job_id = self._resolve(maps['mos'], mos, _("MOS"), errors)
+        if job_id:
+            values['dst_job_id'] = job_id
+            department_id = maps['job_department'].get(job_id) or department_id
+        if department_id:
+            values['dst_department_id'] = department_id
+        elif not errors:
+            # the job has no department and the row gives none
+            errors.append(_("Department is missing"))
+        return values
+
+    def _prepare_rank_assign_line(self, row, maps, errors):
+        rank_id = self._resolve(maps['rank'], self._get_value(row, RANK_COLUMNS), _("Rank"), errors)
+        return {'dst_rank': rank_id}
+
+    def _prepare_lines(self, rows):
+        """ Return the values of the lines and the report of the rows left out. """
+        maps = self._get_lookup_maps()
+        prepare_line = getattr(self, '_prepare_%s_line' % self.order_type)
+        lines = []
+        unmatched = []
+        employee_rows = {}
+        has_description = 'description' in self._get_line_model()._fields
+        for row_number, row in rows:
+            errors = []
+            employee_id = self._resolve(
+                maps['employee'], self._get_value(row, EMPLOYEE_COLUMNS), _("Employee"), errors)
+            values = prepare_line(row, maps, errors)
+            if employee_id in employee_rows:
+                errors.append(_("the employee is already on row %s", employee_rows[employee_id]))
+            elif employee_id in maps['open_line']:
+                errors.append(_("the employee is already in the open order %s",
+                                maps['open_line'][employee_id]))
+            if errors:
+                unmatched.append(_("Row %s: %s", row_number, "; ".join(errors)))
+                continue
+            employee_rows[employee_id] = row_number
+            values['employee_id'] = employee_id
+            description = has_description and self._get_value(row, DESCRIPTION_COLUMNS)
+            if description:
+                values['description'] = str(description)
+            lines.append(values)
+        return lines, unmatched
+
+    def _prepare_order(self, lines):
+        commands = [Command.create(values) for values in lines]
+        values = {
+            'date': self.date,
+            'partner_id': self.partner_id.id,
+            'company_id': self.company_id.id,
+            'assign_line': commands,
+        }
+        # the number of a job assignment is its name
+        values['name' if self.order_type == 'job_assign' else 'number'] = self.number
+        return ORDER_MODELS[self.order_type], values
+
+    def action_import(self):
+        self.ensure_one()
+        # rank assignments are kept to the HR managers, fail before reading the file
+        self.env[ORDER_MODELS[self.order_type]].check_access_rights('create')
+        start = time.perf_counter()
+        rows = self._read_rows()
+        lines, unmatched = self._prepare_lines(rows)
+        if not lines:
+            raise UserError(_("No row of the file could be imported:\n%s", "\n".join(unmatched)))
+        model_name, values = self._prepare_order(lines)
+        order = self.env[model_name].create(values)
+        self.write({
+            'state': 'done',
+            'job_assign_id': order.id if model_name == 'military.job.assign' else False,
+            'rank_assign_id': order.id if model_name == 'rank.assign' else False,
+            'line_count': len(lines),
+            'unmatched_count': len(unmatched),
+            'report': "\n".join(unmatched),
+        })
+        _logger.info("%s imported from %s: %s lines, %s rows unmatched in %.2fs",
+                     order.display_name, self.file_name, len(lines), len(unmatched),
+                     time.perf_counter() - start)
+        if not unmatched:
+            return self.action_open_order()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_open_order(self):
+        self.ensure_one()
+        order = self.job_assign_id or self.rank_assign_id
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': order._name,
+            'res_id': order.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
@@ -16,6 +16,7 @@
     "data": [
         "security/groups.xml",
         "security/ir.model.access.csv",
+        "data/ir_cron_data.xml",
         "views/military_job_views.xml",
         "views/military_job_transfer_views.xml"],
     "sequence": '0',
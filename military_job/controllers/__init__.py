@@ -0,0 +1 @@
+from . import org_chart
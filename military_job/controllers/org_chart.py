@@ -0,0 +1,39 @@
+import hashlib
+import json
+
+from odoo import http
+from odoo.http import request
+
+
+class OrgChartController(http.Controller):
+
+    @http.route('/military_job/org_chart/<int:company_id>', type='http', auth='user',
+                methods=['GET'])
+    def org_chart(self, company_id, **kwargs):
+        """ Department, job and employee tree of a company as compact JSON.
+
+        The ETag changes with the latest write on departments, jobs and
+        employees of the company, so pollers get a 304 while nothing changed.
+        """
+        if company_id not in request.env.user.company_ids.ids:
+            return request.not_found()
+        departments = request.env['hr.department'].with_company(company_id)
+        etag = '"%s"' % hashlib.sha1(repr((
+            request.env.uid,
+            departments._get_org_chart_version(company_id),
+        )).encode()).hexdigest()
+        if etag in self._if_none_match():
+            return request.make_response('', status=304, headers=[('ETag', etag)])
+        data = departments.get_org_chart(company_id)
+        return request.make_response(
+            json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str),
+            headers=[
+                ('Content-Type', 'application/json; charset=utf-8'),
+                ('ETag', etag),
+                ('Cache-Control', 'private, no-cache'),
+            ])
+
+    def _if_none_match(self):
+        header = request.httprequest.headers.get('If-None-Match') or ''
+        tags = (tag.strip() for tag in header.split(','))
+        return {tag[2:] if tag.startswith('W/') else tag for tag in tags if tag}
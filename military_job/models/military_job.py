@@ -32,12 +32,10 @@ class Job(models.Model):
 
     @api.depends('name')
     def _get_declension(self):
-        declension_ua_model = self.env['declension.ua']
         grammatical_cases = ['gent', 'datv', 'ablt']
+        declensions = self.env['declension.ua'].get_declension_fields_batch(self, grammatical_cases)
         for record in self:
-            inflected_fields = declension_ua_model.get_declension_fields(record, grammatical_cases)
-            for field, value in inflected_fields.items():
-                setattr(record, field, value)
+            record.update(declensions[record.id])
 
     active = fields.Boolean(
         'Active',
@@ -77,6 +75,9 @@ class Job(models.Model):
     )
     mos = fields.Char(string="Job MOS code")
     payroll_grade = fields.Char(string="Payroll Grade")
+    # Stored and indexed: the destination job pickers filter on vacancies
+    no_of_employee = fields.Integer(store=True)
+    expected_employees = fields.Integer(store=True, index=True)
 
     # Change sql constraint to have multiple identical job names in one department
     _sql_constraints = [
@@ -117,7 +118,7 @@ class Job(models.Model):
             res.append((job.id, name))
         return res
 
-    @api.depends('no_of_recruitment', 'employee_ids.job_id', 'employee_ids.active')
+    @api.depends('no_of_recruitment', 'employee_ids.job_id', 'employee_ids.active', 'active')
     def _compute_employees(self):
         employee_data = self.env['hr.employee']._read_group([('job_id', 'in', self.ids)],
                                                             ['job_id'], ['job_id'])
@@ -127,6 +128,61 @@ class Job(models.Model):
             job.expected_employees = job.no_of_recruitment - result.get(job.id, 0)
 
 
+class Department(models.Model):
+    _inherit = "hr.department"
+
+    @api.model
+    def _get_org_chart_version(self, company_id):
+        """ Return what changes whenever the org chart of ``company_id`` does:
+        the latest write date and the number of records of every level.
+        """
+        self.env['hr.employee'].flush_model(['company_id', 'job_id', 'department_id', 'active'])
+        self.env['hr.job'].flush_model()
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT (SELECT ROW(max(write_date), count(*))::text FROM hr_department WHERE company_id = %(company)s),
+                   (SELECT ROW(max(write_date), count(*))::text FROM hr_job WHERE company_id = %(company)s),
+                   (SELECT ROW(max(write_date), count(*))::text FROM hr_employee WHERE company_id = %(company)s)
+        """, {'company': company_id})
+        return self.env.cr.fetchone()
+
+    @api.model
+    def get_org_chart(self, company_id):
+        """ Return the department, job and employee tree of ``company_id``.
+
+        Rows are lists described by the ``columns`` of every level; parents
+        are referenced by id and come before their children (ordered by level).
+        """
+        company = self.env['res.company'].browse(company_id)
+        levels = [
+            ('departments', self, ['id', 'parent_id', 'level', 'code', 'complete_name',
+                                   'total_staff', 'total_employee', 'total_vacant'],
+             'level, sequence, id'),
+            ('jobs', self.env['hr.job'], ['id', 'department_id', 'mos', 'complete_name',
+                                          'no_of_recruitment', 'no_of_employee', 'expected_employees'],
+             'level, sequence, id'),
+            ('employees', self.env['hr.employee'], ['id', 'job_id', 'department_id', 'name'], 'id'),
+        ]
+        result = {'company': {'id': company.id, 'name': company.name}, 'columns': {}}
+        for key, model, names, order in levels:
+            # load=None: many2one values as bare ids, without name_get
+            records = model.search_read([('company_id', '=', company_id)], names, order=order, load=None)
+            result['columns'][key] = names
+            result[key] = [[record[name] for name in names] for record in records]
+        return result
+
+
+class Company(models.Model):
+    _inherit = "res.company"
+
+    @api.model
+    def _get_rename_targets(self):
+        return super()._get_rename_targets() + [
+            ('hr.job', ['complete_name', 'complete_name_gent', 'complete_name_datv',
+                        'complete_name_ablt'], 'level, id'),
+        ]
+
+
 class HrEmployee(models.Model):
     _inherit = 'hr.employee'
 
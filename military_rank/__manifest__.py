@@ -8,11 +8,12 @@
     "category": "Other",
     "version": "1.0",
     "license": "Other proprietary",
-    "depends": ["hr"],
+    "depends": ["hr", "military_company"],
     "data": [
         "security/security.xml",
         "security/ir.model.access.csv",
         "data/military.rank.csv",
+        "data/ir_cron_data.xml",
         "views/rank_views.xml",
         "views/rank_transfer_view.xml"
     ],
@@ -1,13 +1,17 @@
+from collections import defaultdict
+
 from odoo import _, api, fields, models
 from odoo.exceptions import AccessError, UserError
 
 
 class RankTransfer(models.Model):
     _name = "rank.transfer"
-    _inherit = ["mail.thread"]
+    _inherit = ["mail.thread", "military.order.scheduler.mixin"]
     _description = "Rank Transfer"
     _rec_name = "complete_name"
     _check_company_auto = True
+    _order_scheduler_cron = "military_rank.ir_cron_rank_transfer_scheduler"
+    _order_line_field = "transfer_line"
 
     number = fields.Char(
         "Order Number",
@@ -40,7 +44,7 @@ class RankTransfer(models.Model):
         index=True,
         states={'draft': [('readonly', False)]},
         copy=False,
-        default=fields.Date.today,
+        default=lambda self: self._get_today(),
         help="Date of transfer"
     )
     partner_id = fields.Many2one(
@@ -78,7 +82,7 @@ class RankTransfer(models.Model):
     def effective_date_in_future(self):
 
         for transfer in self:
-            if transfer.date >= fields.Date.today():
+            if transfer.date >= self._get_today():
                 return False
         return True
 
@@ -100,10 +104,10 @@ class RankTransfer(models.Model):
         has_permission = self._check_permission_group(
             "military_rank.group_rank_transfer"
         )
-        if has_permission and not self.effective_date_in_future():
+        if has_permission and self._is_due():
             self.state_done()
         else:
-            self.write({"state": "confirm"})
+            self._schedule()
 
     def action_confirm(self):
         self.ensure_one()
@@ -156,10 +160,16 @@ class RankTransfer(models.Model):
         return True
 
     def state_done(self):
-        today = fields.Date.today()
+        today = self._get_today()
         for transfer in self:
             if transfer.date <= today:
-                transfer.transfer_line.employee_id.rank_id = transfer.transfer_line.dst_rank
+                # One write per rank: the lines of an order may give different ranks
+                ranks = {line.employee_id: line.dst_rank for line in transfer.transfer_line}
+                employees_by_rank = defaultdict(lambda: self.env['hr.employee'])
+                for employee, rank in ranks.items():
+                    employees_by_rank[rank] |= employee
+                for rank, employees in employees_by_rank.items():
+                    employees.write({'rank_id': rank.id})
                 transfer.state = "done"
                 # transfer.transfer_line.state = "done"
             else:
@@ -203,6 +213,7 @@ class RankTransferLine(models.Model):
         string="Employee",
         comodel_name="hr.employee",
         required=True,
+        index=True,
         readonly=True,
         states={"draft": [("readonly", False)]},
         check_company=True,
@@ -225,10 +236,8 @@ class RankTransferLine(models.Model):
 
     @api.depends("employee_id")
     def _compute_rank(self):
-        if self.employee_id.rank_id:
-            self.src_rank = self.employee_id.rank_id
-        else:
-            self.src_rank = False
+        for line in self:
+            line.src_rank = line.employee_id.rank_id
 
     @api.onchange("employee_id")
     def _onchange_employee(self):
@@ -258,11 +267,6 @@ class HrEmployee(models.Model):
 
     @api.depends('rank_id')
     def _compute_rank_transfer_id(self):
+        orders = self.env['rank.transfer']._get_last_done_orders(self)
         for employee in self:
-            domain = [
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'done'),
-            ]
-            rank_transfer_id = self.env['rank.transfer.line'].search(domain, limit=1,
-                                                                     order='date desc')
-            employee.rank_transfer_id = rank_transfer_id.transfer_id
+            employee.rank_transfer_id = orders.get(employee._origin.id, False)